@@ -0,0 +1,160 @@
+'''
+Runs a use case without the GUI, e.g. on compute servers without a display.
+
+The use case is a JSON file saved by the GUI. The optimization run config is a JSON file with the same structure as an
+entry of the optimization runs table in the GUI:
+{
+    "algorithm": "Only heuristics" or "RL-MuZero",
+    "parameters": {...},
+    "observation_space": {"<variable>": [size, observed?], ...} or ["<observed variable>", ...],
+    "action_space": {"Workstation routing": [direct?, "<heuristic>"], ..., "Action encoding": [false, "Matrix"], "Auto-resolve forced decisions": [true, ""]},
+    "reward_function": {"<KPI>": ["Ignore"/"Reward"/"Punish", scale value, "<unit>"], ...}
+}
+"Only heuristics" simulates every combination of heuristics with parameters["number_of_seeds"] seeds in a process pool
+and writes the KPI tables (see heuristic_evaluation.py), with --single-run only the configured heuristics are simulated once.
+"RL-MuZero" trains MuZero on the use case. The results are written into the output directory.
+
+Example:
+python headless_runner.py --use-case data/moeller_ag.json --run-config run.json --output-dir results/run_1 --seed 0
+'''
+import argparse
+import json
+import pathlib
+import time
+import numpy
+from production_system import ProductionSystem
+from heuristic_evaluation import evaluate_run_config, write_kpi_table
+from time_series_manager import METRICS_SINKS, create_metrics_sink
+
+
+def load_production_system(use_case_path, run_config):
+    '''Loads the use case, prepares it for simulation and applies the optimization run config.'''
+    production_system = ProductionSystem.load_from_json(use_case_path)
+    production_system.make_simulatable()
+    production_system.apply_optimization_run_config(run_config)
+    return production_system
+
+
+def get_order_summary(production_system):
+    '''Returns {order_id: {'completed_instances', 'total_instances', 'completion_time'}}, the completion time is a timestamp like in order_progress.'''
+    order_summary = {}
+    for order_id, order_info in production_system.order_progress.items():
+        end_times = [instance['production_end_time'] for instance in order_info['product_progress']]
+        completed = [end_time for end_time in end_times if end_time is not None]
+        order_summary[order_id] = {'completed_instances': len(completed),
+                                   'total_instances': len(end_times),
+                                   'completion_time': max(completed) if len(completed) == len(end_times) and completed else None}
+    return order_summary
+
+
+def run_heuristic_simulation(production_system, seed=None):
+    '''
+    Simulates one episode in which every decision is made by the heuristic configured for its decision type.
+    Returns the result dictionary written to result.json.
+    '''
+    missing = [decision for decision in ProductionSystem.heuristic_action_types.keys()
+               if production_system.action_config.get(decision, (False, ''))[0] or not production_system.action_config.get(decision, (False, ''))[1]]
+    if missing:
+        raise RuntimeError(f'"Only heuristics" needs an indirect heuristic for every decision type, missing for: {", ".join(missing)}')
+
+    def policy(observation, action_mask):
+        raise RuntimeError('Decision without a heuristic requested during a heuristic simulation')
+
+    if seed is not None:
+        # The simulation draws random numbers (e.g. 'Random' heuristics) from numpy's global generator
+        numpy.random.seed(seed)
+    start_time = time.time()
+    episode = production_system.run_episode(policy, record=False)
+    return {'episode_reward': episode['episode_reward'],
+            'decisions': episode['decisions'],
+            'forced_decisions': episode['forced_decisions'],
+            'simulated_until': production_system.timestamp,
+            'wall_clock_seconds': time.time() - start_time,
+            'orders': get_order_summary(production_system)}
+
+
+def run_muzero_training(production_system, output_dir, seed=None):
+    '''Trains MuZero on the production system like the optimization runs of the GUI, the model is saved in output_dir/muzero.'''
+    # Imported here so that heuristic simulations need neither torch nor ray
+    from muzero.muzero import MuZero
+
+    observation_dimension = sum([entry[0] for entry in production_system.observation_config.values() if entry[1]])
+    action_dimension = production_system.get_action_space_size()
+    muzero_config = {
+        'observation_shape': (1, 1, observation_dimension),
+        'action_space': list(range(action_dimension)),
+        'max_moves': 10000,
+        'training_steps': 1000,
+        'results_path': pathlib.Path(output_dir) / 'muzero'
+    }  # further variable names are in simulation.py/MuZeroConfig class!
+    if seed is not None:
+        muzero_config['seed'] = seed
+    start_time = time.time()
+    muzero = MuZero(game_name='PrOPPlan', production_system=production_system, config=muzero_config)
+    muzero.train()
+    return {'observation_dimension': observation_dimension,
+            'action_dimension': action_dimension,
+            'results_path': str(muzero_config['results_path']),
+            'wall_clock_seconds': time.time() - start_time}
+
+
+def write_result(result, args, run_config, output_dir):
+    result.update({'use_case': args.use_case, 'algorithm': run_config['algorithm'], 'seed': args.seed, 'run_config': run_config})
+    with open(output_dir / 'result.json', 'w') as json_file:
+        json.dump(result, json_file, indent=4)
+    print(f'Results written to {output_dir}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Runs a PrOPPlan use case with an optimization run config without the GUI.')
+    parser.add_argument('--use-case', required=True, help='use case JSON file saved by the GUI')
+    parser.add_argument('--run-config', required=True, help='optimization run config JSON file')
+    parser.add_argument('--output-dir', required=True, help='directory for result.json (and the KPI tables or the MuZero results)')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the random number generators')
+    parser.add_argument('--metrics-sink', default='None', choices=list(METRICS_SINKS.keys()),
+                        help='where buffer fill levels are logged to, "File" writes buffer_metrics.lp into the output directory '
+                             '(not supported by the pooled "Only heuristics" evaluation, use --single-run)')
+    parser.add_argument('--single-run', action='store_true', help='"Only heuristics": simulate only the configured heuristics once')
+    parser.add_argument('--processes', type=int, default=None, help='"Only heuristics": number of worker processes (default: parameters or all cores)')
+    args = parser.parse_args(argv)
+
+    with open(args.run_config, 'r') as json_file:
+        run_config = json.load(json_file)
+    output_dir = pathlib.Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    algorithm = run_config['algorithm']
+
+    if algorithm == 'Only heuristics' and not args.single_run:
+        if args.metrics_sink != 'None':
+            # Every worker process simulates many episodes, their fill levels would end up mixed in one sink
+            parser.error('--metrics-sink is only supported with --single-run for "Only heuristics"')
+        with open(args.use_case, 'r') as json_file:
+            use_case_data = json.load(json_file)
+        start_time = time.time()
+        rows, summary = evaluate_run_config(use_case_data, run_config, base_seed=args.seed or 0, processes=args.processes)
+        write_kpi_table(rows, output_dir / 'kpi_table_episodes.csv')
+        write_kpi_table(summary, output_dir / 'kpi_table.csv')
+        result = {'episodes': len(rows), 'combinations': len(summary), 'best': summary[0] if summary else None,
+                  'wall_clock_seconds': time.time() - start_time}
+        write_result(result, args, run_config, output_dir)
+        return
+
+    production_system = load_production_system(args.use_case, run_config)
+    if args.metrics_sink == 'File':
+        metrics_sink = create_metrics_sink('File', file_path=str(output_dir / 'buffer_metrics.lp'))
+    else:
+        metrics_sink = create_metrics_sink(args.metrics_sink)
+    production_system.set_metrics_sink(metrics_sink)
+
+    if algorithm == 'Only heuristics':
+        result = run_heuristic_simulation(production_system, seed=args.seed)
+    elif algorithm == 'RL-MuZero':
+        result = run_muzero_training(production_system, output_dir, seed=args.seed)
+    else:
+        raise RuntimeError(f'Algorithm {algorithm} can not be run without the GUI')
+    metrics_sink.close()
+    write_result(result, args, run_config, output_dir)
+
+
+if __name__ == '__main__':
+    main()
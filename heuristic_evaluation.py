@@ -0,0 +1,130 @@
+'''
+Evaluation of the "Only heuristics" algorithm: every combination of the heuristics of the four decision types
+is simulated with several random seeds in a process pool. Each worker process builds and prepares its own
+production system once and only resets it between episodes.
+The result is a KPI table with the KPIs of the reward configuration and the reward of each combination.
+'''
+import csv
+import itertools
+import multiprocessing
+import numpy
+from production_system import ProductionSystem
+
+# Production system of the worker process, built once by init_worker()
+_worker_production_system = None
+
+
+def init_worker(use_case_data, run_config):
+    '''Process pool initializer: loads and prepares the production system of this worker.'''
+    global _worker_production_system
+    _worker_production_system = ProductionSystem.from_dict(use_case_data)
+    _worker_production_system.make_simulatable()
+    _worker_production_system.apply_optimization_run_config(run_config)
+
+
+def evaluate_combination(task):
+    '''
+    Simulates one episode of the worker's production system with the heuristics of task = (combination, seed),
+    combination being {decision type: heuristic name}. Returns one row of the KPI table.
+    An episode that fails gets a row with NaN reward and KPIs and the exception in 'Error', so that one bad
+    episode does not abort the whole evaluation (Pool.map() would re-raise it).
+    '''
+    combination, seed = task
+    production_system = _worker_production_system
+    for decision, heuristic in combination.items():
+        production_system.action_config[decision] = (False, heuristic)
+
+    def policy(observation, action_mask):
+        raise RuntimeError('Decision without a heuristic requested during a heuristic simulation')
+
+    # The simulation draws random numbers (e.g. 'Random' heuristics) from numpy's global generator
+    numpy.random.seed(seed)
+    row = dict(combination)
+    row['Seed'] = seed
+    try:
+        episode = production_system.run_episode(policy, record=False)
+        kpi_values = production_system.get_kpi_values()
+    except Exception as e:
+        # The next episode starts with reset(), which also recovers from the aborted one
+        print(f'Episode of {combination} with seed {seed} failed: {type(e).__name__}: {e}')
+        row.update({'Reward': float('nan'), 'Error': f'{type(e).__name__}: {e}'})
+        row.update({kpi: float('nan') for kpi in ProductionSystem.reward_kpis})
+        return row
+    row.update({'Reward': episode['episode_reward'], 'Error': ''})
+    row.update(kpi_values)
+    return row
+
+
+def get_heuristic_combinations(heuristic_options=None):
+    '''Returns a list of {decision type: heuristic name} for all combinations (default: ProductionSystem.get_heuristic_options()).'''
+    if heuristic_options is None:
+        heuristic_options = ProductionSystem.get_heuristic_options()
+    decisions = list(heuristic_options.keys())
+    return [dict(zip(decisions, heuristics)) for heuristics in itertools.product(*heuristic_options.values())]
+
+
+def evaluate_heuristic_combinations(use_case_data, run_config, seeds, combinations=None, processes=None, context=None):
+    '''
+    Simulates every combination (default: all, see get_heuristic_combinations()) with every seed
+    on processes worker processes (default: all cores).
+    use_case_data is the use case dictionary (ProductionSystem.to_dict()), run_config the optimization run config.
+    Returns the rows of all episodes (see evaluate_combination()) ordered by combination and seed.
+    '''
+    if combinations is None:
+        combinations = get_heuristic_combinations()
+    tasks = [(combination, seed) for combination in combinations for seed in seeds]
+    ctx = multiprocessing.get_context(context)
+    with ctx.Pool(processes=processes, initializer=init_worker, initargs=(use_case_data, run_config)) as pool:
+        # Episodes take similarly long, small chunks keep all workers busy until the end
+        chunksize = max(1, len(tasks) // (4 * (processes or multiprocessing.cpu_count())))
+        return pool.map(evaluate_combination, tasks, chunksize=chunksize)
+
+
+def summarize_kpi_table(rows):
+    '''
+    Aggregates the episode rows over the seeds: one row per combination with the mean of the reward and the KPIs
+    and the standard deviation of the reward, sorted by mean reward (best first).
+    Failed episodes (see evaluate_combination()) are only counted, combinations without a successful episode come last with NaN values.
+    '''
+    decisions = list(ProductionSystem.heuristic_action_types.keys())
+    values = ['Reward'] + ProductionSystem.reward_kpis
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(row[decision] for decision in decisions), []).append(row)
+    summary = []
+    for combination, group in groups.items():
+        succeeded = [row for row in group if not row.get('Error')]
+        summary_row = dict(zip(decisions, combination))
+        summary_row['Seeds'] = len(succeeded)
+        summary_row['Failed episodes'] = len(group) - len(succeeded)
+        for value in values:
+            summary_row[value] = float(numpy.mean([row[value] for row in succeeded])) if succeeded else float('nan')
+        summary_row['Reward std'] = float(numpy.std([row['Reward'] for row in succeeded])) if succeeded else float('nan')
+        summary.append(summary_row)
+    summary.sort(key=lambda summary_row: (bool(summary_row['Seeds']), summary_row['Reward'] if summary_row['Seeds'] else 0.0), reverse=True)
+    return summary
+
+
+def write_kpi_table(rows, file_path):
+    '''Writes KPI table rows as CSV.'''
+    with open(file_path, 'w', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=list(rows[0].keys()) if rows else [])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def evaluate_run_config(use_case_data, run_config, base_seed=0, processes=None, context=None):
+    '''
+    Runs the evaluation of an "Only heuristics" optimization run. The algorithm parameters 'number_of_seeds' (default 1)
+    and 'worker_processes' (default: all cores) may be strings as entered in the GUI, an explicit processes argument wins.
+    context is the multiprocessing start method of the pool (default: the platform default), processes started from
+    a threaded program like the GUI have to use 'spawn'.
+    Returns (episode rows, summarized KPI table).
+    '''
+    parameters = run_config.get('parameters', {})
+    number_of_seeds = int(parameters.get('number_of_seeds') or 1)
+    if processes is None and parameters.get('worker_processes'):
+        processes = int(parameters['worker_processes'])
+    seeds = list(range(base_seed, base_seed + number_of_seeds))
+    rows = evaluate_heuristic_combinations(use_case_data, run_config, seeds, processes=processes, context=context)
+    return rows, summarize_kpi_table(rows)
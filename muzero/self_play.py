@@ -12,7 +12,6 @@ import torch
 
 from . import models
 
-from PyQt5 import sip
 
 @ray.remote
 class SelfPlay:
@@ -18,10 +18,12 @@ class OperationNodeClean():
         self.output_name = output_name  # name of the part or subassembly that leaves the operation after processing
 
     def to_dict(self):
+        # display_pos is a QPoint for nodes coming from the GUI and a plain (x, y) pair for nodes loaded by from_dict()
+        display_pos = tuple(self.display_pos) if isinstance(self.display_pos, (list, tuple)) else (self.display_pos.x(), self.display_pos.y())
         return {
             "node_type": self.node_type,
             "operation_name": self.operation_name,
-            "display_pos": object_to_dict((self.display_pos.x(), self.display_pos.y())),
+            "display_pos": object_to_dict(display_pos),
             "node_uid": self.node_uid,
             "components": object_to_dict(self.components),
             "capabilities": object_to_dict(self.capabilities),
@@ -31,6 +33,20 @@ class OperationNodeClean():
             "output_name": self.output_name
         }
 
+    @classmethod
+    def from_dict(cls, node_data : dict):
+        '''Creates an operation node from the saved dictionary of to_dict(), without any Qt objects.'''
+        return cls(node_type=node_data.get("node_type", ""),
+                   operation_name=node_data.get("operation_name", ""),
+                   display_pos=tuple(node_data.get("display_pos", [0, 0])),
+                   node_uid=node_data.get("node_uid", None),
+                   components=node_data.get("components", {}),
+                   capabilities=node_data.get("capabilities", []),
+                   tools=node_data.get("tools", {}),
+                   processing_time_value=node_data.get("processing_time_value", 0.0),
+                   processing_time_unit=node_data.get("processing_time_unit", ""),
+                   output_name=node_data.get("output_name", ""))
+
 class ProductPalette():
     '''
     The product palette of a company is stored as a dictionary with
@@ -47,6 +63,30 @@ class ProductPalette():
         }
 
 
+    @classmethod
+    def from_dict(cls, palette_data : dict):
+        '''
+        Creates a product palette from the saved dictionary of to_dict() with OperationNodeClean objects.
+        Connections refer to the same node object wherever the same node_uid appears within a product.
+        '''
+        product_palette = {}
+        for product_id, connections in palette_data["product_palette"].items():
+            nodes = {}  # node_uid: OperationNodeClean
+            connection_list = []
+            for connection in connections:
+                # Skip empty or incomplete connections
+                if not connection or len(connection) < 2:
+                    continue
+                pair = []
+                for node_data in connection[:2]:
+                    node_uid = node_data.get("node_uid", None)
+                    if node_uid not in nodes:
+                        nodes[node_uid] = OperationNodeClean.from_dict(node_data)
+                    pair.append(nodes[node_uid])
+                connection_list.append(tuple(pair))
+            product_palette[product_id] = connection_list
+        return cls(product_palette=product_palette)
+
     def add_product_graph(self, product_id, connection_list):
         print(f"--> Updated product graph for product {product_id}")
         self.product_palette.update({copy(product_id): copy(connection_list)})
@@ -135,8 +175,9 @@ class ProductPalette():
             predecessors = [precedence[0] for precedence in precedence_list]
             # Get all successor operations
             successors = [precedence[1] for precedence in precedence_list]
-            # Get the union of these two sets
-            all_operations = list(set(predecessors).union(successors))
+            # Get the union of these two lists in the order of the connections, a set of nodes would be ordered
+            # by their memory addresses and change the order of the simulated decisions between loads
+            all_operations = list(dict.fromkeys(predecessors + successors))
 
             # Important for Ray serialization: strip OperationNode objects of all Qt functions!
             all_clean_operations = []
@@ -201,3 +242,33 @@ class ProductPalette():
         durations = {1: 3, 2: 2, 3: 4, 4: 5}  # Processing times of each node
 
         critical_duration = critical_path_duration(edges, durations)
+
+    def tail_lengths(self, edges, durations):
+        """
+        Computes the tail length of each operation, i.e. the longest path from the start of the operation to the end of the product.
+
+        :param edges: List of tuples (u, v) meaning operation u must precede v.
+        :param durations: Dict {node: processing_duration} for each operation.
+        :return: Dict {node: tail length}, operations without successors have their own duration as tail length.
+        """
+        successors = defaultdict(list)
+        out_degree = {node: 0 for node in durations}
+        for u, v in edges:
+            successors[u].append(v)
+            out_degree[u] += 1
+
+        predecessors = defaultdict(list)
+        for u, v in edges:
+            predecessors[v].append(u)
+
+        # Reverse topological order, starting from the last operations
+        tail = {}
+        queue = deque([node for node in out_degree if out_degree[node] == 0])
+        while queue:
+            node = queue.popleft()
+            tail[node] = durations[node] + max([tail[successor] for successor in successors[node]], default=0)
+            for predecessor in predecessors[node]:
+                out_degree[predecessor] -= 1
+                if out_degree[predecessor] == 0:
+                    queue.append(predecessor)
+        return tail
@@ -1,12 +1,15 @@
 from copy import copy, deepcopy
 from order_list import OrderList, Order
 from product_instructions import ProductPalette
-from time_series_manager import TimeSeriesManager
+from time_series_manager import MetricsSink
 import math
 from enum import Enum, IntEnum
 from file_utils import object_to_dict
 from collections import deque
 from datetime import datetime
+import json
+import struct
+import zlib
 import numpy
 import fnmatch
 
@@ -365,8 +368,8 @@ class Buffer():
         self.comp_specific_sizes = comp_specific_sizes  # How many of each component (type) can this buffer contain?
         self.identical_buffer = identical_buffer  # What input buffer is this one identical to: <workstation_id> : IN/OUT : <idx 1>
         self.fill_level_history = []  # List of tuples (timestamp, fill_level)
-        # TODO: If InfluxDB is not an overkill for a single Gantt chart, then integrate it. But currently it seems to be an overkill.
-        #self.time_series_manager = TimeSeriesManager()  # For InfluxDB logging
+        self.metrics_sink : MetricsSink = None  # Only set by ProductionSystem.set_metrics_sink() if the sink is enabled
+        self.metrics_id = ''  # <workstation_id> : IN/OUT : <idx 1>, set together with the metrics sink
 
         # Simulation trackers
         self.contents = {}  # component_name: quantity
@@ -391,22 +394,24 @@ class Buffer():
         """
         return fnmatch.fnmatch(to_check, regex_string)
     
-    def accepts_objects(self, objects : tuple):
+    def accepts_objects(self, objects : tuple, contents : dict = None):
         '''
         Returns True if the objects can be fit into the buffer, False otherwise.
+        Does not modify the buffer.
 
         Args:
             objects (tuple): (component, quantity)
+            contents (dict): hypothetical buffer contents {component_name: quantity} to check against
+                             instead of the current contents (used for capacity planning)
         '''
         component = objects[0]
         quantity = objects[1]
 
+        if contents is None:
+            contents = self.contents
+
         if self.comp_specific_sizes == {}:
             return True
-        
-        # Make sure there is a key-value pair to add to in the buffer contents dict
-        if component not in self.contents.keys():
-            self.contents.update({component: 0})
 
         allowed_combination_group = ''
         if not self.diff_comp_comb:
@@ -421,7 +426,7 @@ class Buffer():
                 if allowed_combination_group != self.comp_specific_sizes[allowed_component_pattern]['Group']:
                     # Find all components currently in the buffer that belong to other combination groups
                     matching_contents = []
-                    for comp, qty in self.contents.items():
+                    for comp, qty in contents.items():
                         if self.material_matches_wildcard(comp, allowed_component_pattern) and qty > 0:
                             matching_contents.append(comp)
                     if len(matching_contents) > 0:
@@ -431,13 +436,13 @@ class Buffer():
                     if not self.material_matches_wildcard(component, allowed_component_pattern):
                         if allowed_combination_group == '':
                             matching_contents = []
-                            for comp, qty in self.contents.items():
+                            for comp, qty in contents.items():
                                 if self.material_matches_wildcard(comp, allowed_component_pattern) and qty > 0:
                                     matching_contents.append(comp)
                             if len(matching_contents) > 0:
                                 return False
                         occupied_relative_capacity = 0.0
-                        for comp, qty in self.contents.items():
+                        for comp, qty in contents.items():
                             for acp in self.comp_specific_sizes.keys():
                                 if self.material_matches_wildcard(comp, acp) and allowed_combination_group == self.comp_specific_sizes[acp]['Group']:
                                     occupied_relative_capacity += qty / self.comp_specific_sizes[acp]['Max. quantity']
@@ -453,7 +458,7 @@ class Buffer():
                             return False
                         if (available_relative_capacity > quantity / checked_component_max_qty or
                             math.isclose(available_relative_capacity, quantity / checked_component_max_qty)):
-                            if (self.contents[component] + quantity) % self.comp_specific_sizes[allowed_component_pattern]['Quantity step'] != 0:
+                            if (contents.get(component, 0) + quantity) % self.comp_specific_sizes[allowed_component_pattern]['Quantity step'] != 0:
                                 # TODO: Products of batch operations (e.g. two operations in the same batch need to be finished
                                 # for their products to be accepted in an output buffer)
                                 return False
@@ -463,7 +468,7 @@ class Buffer():
                             return False
                     elif self.material_matches_wildcard(component, allowed_component_pattern):
                         occupied_relative_capacity = 0.0
-                        for comp, qty in self.contents.items():
+                        for comp, qty in contents.items():
                             for acp in self.comp_specific_sizes.keys():
                                 if self.material_matches_wildcard(comp, acp) and allowed_combination_group == self.comp_specific_sizes[acp]['Group']:
                                     occupied_relative_capacity += qty / self.comp_specific_sizes[acp]['Max. quantity']
@@ -478,7 +483,7 @@ class Buffer():
                             return False
                         if (available_relative_capacity > quantity / checked_component_max_qty or
                             math.isclose(available_relative_capacity, quantity / checked_component_max_qty)):
-                            if (self.contents[component] + quantity) % self.comp_specific_sizes[allowed_component_pattern]['Quantity step'] != 0:
+                            if (contents.get(component, 0) + quantity) % self.comp_specific_sizes[allowed_component_pattern]['Quantity step'] != 0:
                                 # TODO: Products of batch operations (e.g. two operations in the same batch need to be finished
                                 # for their products to be accepted in an output buffer)
                                 return False
@@ -489,7 +494,7 @@ class Buffer():
 
             if self.diff_comp_comb:
                 occupied_relative_capacity = 0.0
-                for comp, qty in self.contents.items():
+                for comp, qty in contents.items():
                     for acp in self.comp_specific_sizes.keys():
                         if self.material_matches_wildcard(comp, acp):
                             occupied_relative_capacity += qty / self.comp_specific_sizes[acp]['Max. quantity']
@@ -507,7 +512,7 @@ class Buffer():
                 if (available_relative_capacity > quantity / checked_component_max_qty or
                     math.isclose(available_relative_capacity, quantity / checked_component_max_qty)):
                     #if self.contents[component] + quantity % self.comp_specific_sizes[allowed_component_pattern]['Quantity step'] != 0:
-                    if (self.contents[component] + quantity) % checked_component_qty_step != 0:
+                    if (contents.get(component, 0) + quantity) % checked_component_qty_step != 0:
                         return False
                     else:
                         break  # return True
@@ -535,13 +540,9 @@ class Buffer():
         current_fill_level = self.get_fill_level()
         # Low-level table update
         self.fill_level_history.append((change_timestamp, current_fill_level))
-        # TODO: Integrate if necessary
-        # InfluxDB
-        # self.time_series_manager.log_buffer_state(
-        #     workstation_id + " : " + self.buffer_location.name + " : " + str(self.idx1),
-        #     current_fill_level,
-        #     change_timestamp
-        # )
+        # External time series storage (see time_series_manager.py)
+        if self.metrics_sink is not None:
+            self.metrics_sink.log_buffer_state(self.metrics_id, current_fill_level, change_timestamp)
 
     def get_average_fill_level(self):
         if not self.fill_level_history:
@@ -572,7 +573,9 @@ class Buffer():
             weighted_variance += duration * (fill_level - avg) ** 2
             total_duration += duration
             
-        return math.sqrt(weighted_variance / total_duration) if total_duration > 0 else 0.0
+        # Deliveries handled after later events log timestamps that go backwards, the negative durations
+        # can make the weighted variance negative (clamped like time_weighted_fill_level_stats())
+        return math.sqrt(max(weighted_variance / total_duration, 0.0)) if total_duration > 0 else 0.0
 
 
 class Inventory():
@@ -931,6 +934,7 @@ class Workstation():
         self.setup_time = 0.0  # cumulative time in status SETUP
         self.status_history = []  # List of tuples like (timestamp, new status list)
         self.utilization_history = []  # List of tuples like (timestamp, utilization float 0-1)
+        self.queued_processing_time = 0.0  # Sum of processing times of the operations in input_operation_buffer, kept up to date by enqueue/dequeue_operation()
 
         # Simulation helper variables - populated when make_simulatable() of the production system is called
         # Helper lists of workstations' possible provided capabilities, tools and materials
@@ -938,6 +942,16 @@ class Workstation():
         self.potential_tools = list()
         self.potential_materials = dict()  # basically aggregates info of physical input buffers
 
+    def enqueue_operation(self, op_quadruple : tuple, processing_time : float):
+        '''Appends an operation (operation_id, product_id, order_id, instance) to the input operation buffer and counts its processing time.'''
+        self.input_operation_buffer.append(op_quadruple)
+        self.queued_processing_time += processing_time
+
+    def dequeue_operation(self, op_quadruple : tuple, processing_time : float):
+        '''Removes an operation (operation_id, product_id, order_id, instance) from the input operation buffer and discounts its processing time.'''
+        self.input_operation_buffer.remove(op_quadruple)
+        self.queued_processing_time -= processing_time
+
     def update_timers(self, delta_t):
         if self.status and self.status[-1] == WorkstationStatus.BUSY:
             self.busy_time += delta_t
@@ -979,8 +993,8 @@ class Workstation():
 
         # Aggregate wip_components by component name
         agg_wip_components = []
-        # Make a set of unique component names in wip_components
-        unique_comp = list(set([cq_dict['Component'] for cq_dict in self.wip_components]))
+        # Make a list of unique component names in wip_components (in their order, sets of strings are ordered by hash)
+        unique_comp = list(dict.fromkeys([cq_dict['Component'] for cq_dict in self.wip_components]))
         # Count components and write the result in the aggregated version
         for comp_id in unique_comp:
             agg_item = {'Component': comp_id, 'Quantity': 0}
@@ -1054,14 +1068,8 @@ class Workstation():
         '''
         for buffer in self.physical_output_buffers.values():
             # Check for identical buffers (i.e. input buffers of other workstations)
-            is_identical_buffer = False
-            if buffer.identical_buffer != '':
-                is_identical_buffer = True
-                identical_buffer_str_split = buffer.identical_buffer.split(' : ')
-                other_workstation_id = identical_buffer_str_split[0]
-                buffer_idx1 = int(identical_buffer_str_split[2])
-                other_workstation = production_system.workstations[other_workstation_id]
-                buffer = other_workstation.physical_input_buffers[buffer_idx1]
+            buffer, other_workstation = self.resolve_identical_buffer(buffer, production_system)
+            is_identical_buffer = other_workstation is not None
             if buffer.accepts_objects(objects_to_move):
                 if is_identical_buffer:
                     # Generate MaterialsArrivalEvent for the workstation connected via identical buffer
@@ -1076,6 +1084,57 @@ class Workstation():
         return None
     
 
+    def resolve_identical_buffer(self, buffer, production_system):
+        '''
+        Returns a tuple (buffer that physically receives objects put into the given physical output buffer,
+        workstation owning it if it is an input buffer of another workstation, None otherwise).
+        '''
+        if buffer.identical_buffer == '':
+            return buffer, None
+        identical_buffer_str_split = buffer.identical_buffer.split(' : ')
+        other_workstation = production_system.workstations[identical_buffer_str_split[0]]
+        return other_workstation.physical_input_buffers[int(identical_buffer_str_split[2])], other_workstation
+
+    def plan_moves_to_physical_output_buffers(self, objects_to_move : list, production_system, occupancy=None):
+        '''
+        Side-effect-free capacity planning counterpart of move_objects_to_physical_output_buffer().
+        Every Component-Quantity dictionary in objects_to_move is treated as a separate move
+        (a single product or a bundle of identical products). The moves are planned one after another
+        on hypothetical buffer occupancies, so later moves see the space taken by earlier ones.
+        Neither buffer contents, wip_components nor the event queue are changed.
+
+        Returns a list with one tuple per move in the format of move_objects_to_physical_output_buffer():
+        (fits, 1-index of the output buffer, list of Component-Quantity dictionaries of moved objects).
+
+        Args:
+            objects_to_move (list): Component-Quantity dictionaries, one per move
+            occupancy (dict): hypothetical contents per receiving buffer {id(buffer): {component: quantity}},
+                              initialized from current contents if None; updated in place to chain plans
+        '''
+        if occupancy is None:
+            occupancy = {}
+        wip_component_names = set([cq_dict['Component'] for cq_dict in self.wip_components])
+        planned_moves = []
+        for move_dict in objects_to_move:
+            component = move_dict['Component']
+            quantity = move_dict['Quantity']
+            if component not in wip_component_names:
+                # move_objects_to_physical_output_buffer() would not find the objects in wip_components
+                planned_moves.append((False, None, None))
+                continue
+            planned_move = (False, None, [{'Component': component, 'Quantity': 0}])
+            for output_buffer in self.physical_output_buffers.values():
+                buffer, _ = self.resolve_identical_buffer(output_buffer, production_system)
+                if id(buffer) not in occupancy.keys():
+                    occupancy[id(buffer)] = dict(buffer.contents)
+                contents = occupancy[id(buffer)]
+                if buffer.accepts_objects((component, quantity), contents=contents):
+                    contents[component] = contents.get(component, 0) + quantity
+                    planned_move = (True, output_buffer.idx1, [move_dict])
+                    break
+            planned_moves.append(planned_move)
+        return planned_moves
+
     def remove_objects_from_output_buffers(self, objects : list, timestamp=0):
         '''
         Removes specified objects from physical output buffers of the workstation.
@@ -1425,6 +1484,102 @@ class ActionType(IntEnum):
     TRANSPORT_ROUTING = 4
 
 
+# Binary checkpoint format of the shop-floor state (see ProductionSystem.checkpoint_to_bytes)
+CHECKPOINT_MAGIC = b'PSCP'
+CHECKPOINT_VERSION = 1
+CHECKPOINT_FLAG_COMPRESSED = 1
+CHECKPOINT_OPERATION_ARRAYS = [('status', 'int8'), ('location', 'int32'), ('remaining_work', 'float64'),
+                               ('start_time', 'float64'), ('finish_time', 'float64')]
+CHECKPOINT_INSTANCE_ARRAYS = [('production_end_time', 'float64'), ('productive_time', 'float64')]
+
+
+def checkpoint_number(value : float):
+    '''Converts a float read from a checkpoint array back to None (NaN), int (integral values) or float.'''
+    if math.isnan(value):
+        return None
+    if value.is_integer():
+        return int(value)
+    return value
+
+
+# Registry of workstation sequencing (dispatching) rules, selectable as indirect heuristic in the action space configuration.
+# A rule gets a dict of candidate attribute arrays (one entry per alternative operation) and the current timestamp
+# and returns a priority array, the alternative with the lowest priority is processed next (first one on ties).
+# Candidate attributes (see ProductionSystem.get_sequencing_candidate_attributes()):
+#   'queue_position', 'processing_time', 'deadline', 'remaining_operations', 'remaining_work', 'tail_length'
+WORKSTATION_SEQUENCING_RULES = {}
+ATC_LOOKAHEAD = 2.0  # Look-ahead parameter k of the apparent tardiness cost rule
+
+
+def workstation_sequencing_rule(name : str):
+    '''Decorator that registers a function as workstation sequencing rule under the given (displayed) name.'''
+    def register(rule):
+        WORKSTATION_SEQUENCING_RULES[name] = rule
+        return rule
+    return register
+
+
+def register_weighted_sequencing_rule(name : str, weights : dict):
+    '''
+    Registers a composite workstation sequencing rule as weighted sum of already registered rules {rule name: weight}.
+    The priorities of each rule are min-max normalized over the candidates before weighting.
+    '''
+    rules = [(WORKSTATION_SEQUENCING_RULES[rule_name], weight) for rule_name, weight in weights.items()]
+    def weighted_rule(candidates, timestamp):
+        combined = numpy.zeros(len(candidates['queue_position']))
+        for rule, weight in rules:
+            priorities = rule(candidates, timestamp)
+            spread = priorities.max() - priorities.min()
+            if spread > 0:
+                combined += weight * (priorities - priorities.min()) / spread
+        return combined
+    WORKSTATION_SEQUENCING_RULES[name] = weighted_rule
+
+
+@workstation_sequencing_rule('FIFO')
+def fifo_rule(candidates, timestamp):
+    return candidates['queue_position']
+
+@workstation_sequencing_rule('Longest processing time (LPT)')
+def lpt_rule(candidates, timestamp):
+    return -candidates['processing_time']
+
+@workstation_sequencing_rule('Shortest processing time (SPT)')
+def spt_rule(candidates, timestamp):
+    return candidates['processing_time']
+
+@workstation_sequencing_rule('Earliest deadline first (EDF)')
+def edf_rule(candidates, timestamp):
+    return candidates['deadline']
+
+@workstation_sequencing_rule('Least operations remaining (LOR)')
+def lor_rule(candidates, timestamp):
+    return candidates['remaining_operations']
+
+@workstation_sequencing_rule('Most operations remaining (MOR)')
+def mor_rule(candidates, timestamp):
+    return -candidates['remaining_operations']
+
+@workstation_sequencing_rule('Critical ratio (CR)')
+def critical_ratio_rule(candidates, timestamp):
+    # Time till deadline per second of remaining critical path, below 1 the order is expected to be late
+    return (candidates['deadline'] - timestamp) / numpy.maximum(candidates['tail_length'], 1.0)
+
+@workstation_sequencing_rule('Slack per remaining operation (S/RO)')
+def slack_per_remaining_operation_rule(candidates, timestamp):
+    slack = candidates['deadline'] - timestamp - candidates['tail_length']
+    return slack / numpy.maximum(candidates['remaining_operations'], 1)
+
+@workstation_sequencing_rule('Apparent tardiness cost (ATC)')
+def apparent_tardiness_cost_rule(candidates, timestamp):
+    processing_time = numpy.maximum(candidates['processing_time'], 1.0)
+    slack = numpy.maximum(candidates['deadline'] - timestamp - candidates['tail_length'], 0.0)
+    # Highest index first, hence the negation
+    return -numpy.exp(-slack / (ATC_LOOKAHEAD * processing_time.mean())) / processing_time
+
+register_weighted_sequencing_rule('Weighted EDF and SPT', {'Earliest deadline first (EDF)': 0.5, 'Shortest processing time (SPT)': 0.5})
+
+
 class ProductionSystem():
     '''
     Stores all information of the production system.
@@ -1490,7 +1645,9 @@ class ProductionSystem():
                         },
                         'production_end_time': None,
                         'productive_time': 120,
-                        'critical_path_duration': 500
+                        'critical_path_duration': 500,
+                        'remaining_operations': 3,  # operations with remaining work, kept up to date incrementally
+                        'remaining_work': 97  # sum of the operations' remaining work, kept up to date incrementally
                      },
                     {
                         'product_id': 'product_1',
@@ -1514,7 +1671,9 @@ class ProductionSystem():
                         },
                         'production_end_time': None,
                         'productive_time': 360,
-                        'critical_path_duration': 500
+                        'critical_path_duration': 500,
+                        'remaining_operations': 2,
+                        'remaining_work': 60
                      },
                 ],
                 'release_time' : 123456789,
@@ -1526,21 +1685,33 @@ class ProductionSystem():
                 ]
             }
                           }
+        self.instance_progress_index = dict()  # {(order_id, product_id, product_instance): instance data in order_progress} for direct lookups
         self.product_operations = dict()  # Used to efficiently represent actions and observations by giving operation (node) lists instead of precedence links (edges)
         self.worker_pool_tracker = dict()  # {worker_pool_id: [worker_id_1, worker_id_2]} - updated dynamically! worker_pools is just static information about worker pool composition!
         self.tool_pool_tracker = dict()  # analog to worker_pool_tracker
         self.tool_state_tracker = dict()  # Almost same structure as operations' tools dict, only with the current values of properties instead
         self.raw_material_names = list()  # To quickly discern between externally ordered / supplied materials and system-internal products
         self.last_materials_request : MaterialsRequest = None  # To avoid material request fulfillment of other identical operations
+        self.warm_start_state = None  # Shop-floor state dict (see get_shop_floor_state) that reset() restores instead of the empty system
+        self.initial_shop_floor_state = None  # Shop-floor state of the empty system, taken by make_simulatable() and restored by reset()
 
         # RL observation space configuration
         self.raw_observation_vector_sizes = dict()  # Will give the number of flattened vector entries resulting from observing certain raw state variables
+        self.observation_top_k = 5  # Number of queued operation slots per workstation in 'Workstations: top-K queued operations'
         self.agg_observation_vector_sizes = dict()  # Same for aggregated state variables
+        self.observation_block_offsets = dict()  # {observed variable: (start, end)} in the observation buffer, computed once per observation config
+        self.observation_buffer = None  # Preallocated float32 observation vector, only dirty blocks are rewritten by get_obs()
+        self.observation_dirty = dict()  # {observed variable: True if its underlying state changed since the last get_obs()}
+        self.observation_timestamp = None  # Timestamp at which time-dependent observation blocks were last computed
+        self.observation_index_maps = dict()  # {entity type: {entity ID: index}} for one-hot observation blocks
+        self.operation_instance_durations = numpy.zeros(0)  # Processing time (s) of every operation instance in order_progress iteration order
+        self.operation_processing_times = dict()  # {(product_id, operation_id): processing time}, for the queued work counters of workstations
+        self.operation_tail_lengths = dict()  # {(product_id, operation_id): longest path through the product graph from this operation on}
 
         # Action space encoding as a single matrix (similar to a game board):
         # Rows: operations (unique per customer order) + transport machines + 1 row for decision skipping
         # Columns: workstations + inventories + 1 column for decision skipping
-        # Values: 0 if action not available, 1 if legal and available action
+        # Values: 0 if action not available, 1 if legal and available action (kept flattened as legal_action_mask)
         # The action is encoded as an integer coordinate in the flattened action space matrix.
         # Note: in terms of selecting an action, there is no difference between instances/copies
         # of the same product within the same customer order since they share the same deadline.
@@ -1551,7 +1722,21 @@ class ProductionSystem():
         self.action_matrix_col_dict = {}
         self.action_matrix_reverse_row_dict = {}  # to get string name by integer index
         self.action_matrix_reverse_col_dict = {}
-        self.action_matrix = None
+        # Alternative compact encoding: only statically feasible (row, column) cells of the action matrix are enumerated
+        self.pending_heuristic_action = None  # Cell action chosen by a configured heuristic, applied by set_action() after run_until_decision_point() returns
+        self.auto_resolve_forced_decisions = False  # If True, step() applies decisions with a single real option itself instead of returning them to the agent
+        self.forced_decision_count = 0  # Number of forced decisions applied by step() since reset()
+        self.legal_cell_count = 0  # Number of legal action matrix cells of the current decision (independent of the action encoding)
+        self.action_encoding = 'matrix'  # 'matrix': action = row * n_cols + column, 'compact': action = index of the feasible cell, 'heuristic': action = index in heuristic_actions
+        self.heuristic_actions = self.get_heuristic_actions()  # (decision type, heuristic name), fixed per optimization run by apply_optimization_run_config()
+        self.compact_action_cells = numpy.zeros((0, 2), dtype=numpy.int64)  # decode table: compact action -> (row, column)
+        self.compact_action_index = {}  # encode table: (row, column) -> compact action
+        self.legal_action_mask = None  # Flattened boolean action matrix of the current decision, allocated once
+        self.legal_actions_cache = None  # Legal actions of the current decision, None if they need to be regenerated
+        self.legal_actions_cache_key = None  # (state_version, required_action_type, action_relevant_info) the cache was generated for
+        self.state_version = 0  # Monotonically increasing, bumped by set_action() and the simulation kernel whenever the state changes
+        self.obs_cache = None  # (state_version, observation) of the last get_obs() call
+        self.done_cache = None  # (state_version, done flag) of the last is_done() call
 
         # The simulation logic (set_action within step function) should provide following information about the required actions:
         # 1. Workstation routing: tuple (operation_id, product_id, order_id), list of eligible workstations' IDs
@@ -1565,11 +1750,14 @@ class ProductionSystem():
         self.planning_algorithm = ''
         self.algorithm_parameters = {}  # key: parameter name (str), value: parameter value (str!) - only relevant for RL
         self.observation_config = {}  # key: variable/KPI name (str), value: observed? (boolean)
-        self.action_config = {}  # key: decision type (str), value: tuple(direct action? (boolean), indirect heuristic name (str))
+        self.action_config = {}  # key: decision type (str), value: tuple(direct action? (boolean), indirect heuristic name (str)); 'Action encoding': (False, 'Matrix'/'Compact'/'Heuristic'), 'Auto-resolve forced decisions': (bool, '')
         self.reward_config = {}  # key: KPI name (str), value: tuple('Ignore'/'Reward'/'Punish' (str), 1-point scale value (float), unit (str))
 
         self.is_prepared = False  # To track whether make_simulatable() has been calledon this production system object
 
+        # External time series storage of buffer fill levels (see time_series_manager.py and set_metrics_sink()), disabled by default
+        self.metrics_sink : MetricsSink = None
+
         # Dev and test shortcuts
         self.ignore_ws_skip = True  # If True, "skip" will not be included in workstation sequencing legal actions
 
@@ -1839,7 +2027,115 @@ class ProductionSystem():
             single_order_data.update({'release_time': int(datetime.strptime(order.release_time, "%d.%m.%Y %H:%M").timestamp())})
             single_order_data.update({'deadline': int(datetime.strptime(order.deadline, "%d.%m.%Y %H:%M").timestamp())})
             self.order_progress.update({order_id: single_order_data})
+        self.prepare_instance_progress_index()
+
+    def prepare_instance_progress_index(self):
+        '''
+        Indexes the product instances in order_progress by (order_id, product_id, product_instance)
+        and (re)counts their remaining operations and remaining work.
+        Gets called whenever order_progress is (re)built, afterwards the counters are updated incrementally once operations finish.
+        '''
+        self.instance_progress_index = {}
+        for order_id, order_data in self.order_progress.items():
+            for instance_data in order_data['product_progress']:
+                remaining_work = [operation_data['remaining_work'] for operation_data in instance_data['operation_progress'].values()]
+                instance_data['remaining_operations'] = len([work for work in remaining_work if work > 0])
+                instance_data['remaining_work'] = sum(remaining_work)
+                self.instance_progress_index[(order_id, instance_data['product_id'], instance_data['product_instance'])] = instance_data
+
 
+    def prepare_operation_instance_durations(self):
+        '''
+        Precomputes the processing time (seconds) of every operation instance in the iteration order of order_progress,
+        e.g. to normalize remaining work in observations. Requires processing_time_to_seconds() to be called before.
+        '''
+        durations = []
+        for order_data in self.order_progress.values():
+            for instance_data in order_data['product_progress']:
+                operation_durations = {op.operation_name: self.get_int_seconds(op.processing_time_value, op.processing_time_unit)
+                                       for op in self.product_operations[instance_data['product_id']]}
+                for operation_id in instance_data['operation_progress'].keys():
+                    durations.append(operation_durations[operation_id])
+        self.operation_instance_durations = numpy.array(durations, dtype=numpy.float64)
+
+    def prepare_operation_processing_times(self):
+        '''
+        Precomputes {(product_id, operation_id): processing time} for the queued work counters of workstations
+        and sets these counters according to the current input operation buffers.
+        Also precomputes {(product_id, operation_id): tail length} from the product graphs for the sequencing rules.
+        '''
+        self.operation_processing_times = {}
+        self.operation_tail_lengths = {}
+        for product_id, operation_list in self.product_operations.items():
+            durations = {}
+            for operation in operation_list:
+                self.operation_processing_times[(product_id, operation.operation_name)] = operation.processing_time_value
+                durations[operation.operation_name] = operation.processing_time_value
+            edges = [(edge[0].operation_name, edge[1].operation_name) for edge in self.product_instructions.product_palette[product_id]]
+            for operation_id, tail_length in self.product_instructions.tail_lengths(edges, durations).items():
+                self.operation_tail_lengths[(product_id, operation_id)] = tail_length
+        self.recount_queued_processing_times()
+
+    def recount_queued_processing_times(self):
+        '''Sets the queued work counters of all workstations according to their input operation buffers.'''
+        for workstation in self.workstations.values():
+            workstation.queued_processing_time = sum([self.operation_processing_times[(op_quad[1], op_quad[0])] for op_quad in workstation.input_operation_buffer])
+
+
+    def prepare_compact_action_index(self):
+        '''
+        Enumerates all statically feasible cells of the action matrix in row-major order:
+        - operation rows x technically eligible workstations (workstation routing and sequencing),
+        - transport machine rows x workstations, inventories and 'skip' (transport sequencing and routing),
+        - 'skip' row x workstations (skipping a workstation sequencing decision).
+        '''
+        skip_col = self.action_matrix_col_dict['skip']
+        location_cols = [j for location_id, j in self.action_matrix_col_dict.items() if location_id != 'skip']
+        eligible_cols_by_operation = {}  # {(product_id, operation_id): [workstation columns]}, eligibility does not depend on the order
+        for product_id, operation_list in self.product_operations.items():
+            for operation in operation_list:
+                eligible_cols_by_operation[(product_id, operation.operation_name)] = sorted([self.action_matrix_col_dict[ws_id] for ws_id in self.eligible_workstations_for_operation(operation)])
+        ws_cols = sorted([self.action_matrix_col_dict[ws_id] for ws_id in self.workstations.keys()])
+
+        cells = []
+        for row_id, i in sorted(self.action_matrix_row_dict.items(), key=lambda item: item[1]):
+            if row_id == 'skip':
+                cells.extend([(i, j) for j in ws_cols])
+            elif row_id in self.transport_machines.keys():
+                cells.extend([(i, j) for j in sorted(location_cols + [skip_col])])
+            else:
+                operation_id, product_id, order_id = row_id.split('|')
+                cells.extend([(i, j) for j in eligible_cols_by_operation[(product_id, operation_id)]])
+        self.compact_action_cells = numpy.array(cells, dtype=numpy.int64).reshape(-1, 2)
+        self.compact_action_index = {cell: k for k, cell in enumerate(cells)}
+
+    def get_action_space_size(self):
+        '''Returns the number of integer actions of the selected action encoding.'''
+        if self.action_encoding == 'heuristic':
+            return len(self.heuristic_actions)
+        if self.action_encoding == 'compact':
+            return len(self.compact_action_cells)
+        return self.action_matrix_n_rows * self.action_matrix_n_cols
+
+    def encode_action(self, i : int, j : int):
+        '''
+        Encodes a cell (row i, column j) of the action matrix as an integer action of the selected action encoding.
+        With the 'heuristic' encoding cells are encoded like with 'matrix', these cell actions are only used internally by set_cell_action().
+        '''
+        if self.action_encoding == 'compact':
+            if (i, j) not in self.compact_action_index.keys():
+                raise RuntimeError(f'Action matrix cell {self.action_matrix_reverse_row_dict[i]} / {self.action_matrix_reverse_col_dict[j]} is not in the compact action index')
+            return self.compact_action_index[(i, j)]
+        return i * self.action_matrix_n_cols + j
+
+    def decode_action(self, action : int):
+        '''Returns the action matrix cell (row i, column j) of an integer action of the selected action encoding.'''
+        if self.action_encoding == 'compact':
+            i, j = self.compact_action_cells[action]
+            return int(i), int(j)
+        j = action % self.action_matrix_n_cols
+        i = int((action - j) / self.action_matrix_n_cols)
+        return i, j
 
     def calculate_action_matrix_dimensions(self):
         # Reserve rows for transport machines and 1 row for decision skipping
@@ -1908,6 +2204,8 @@ class ProductionSystem():
         self.raw_observation_vector_sizes.update({'Operations: location (workstation)': N_op * N_ws})
         self.raw_observation_vector_sizes.update({'Operations: remaining work': N_op})
         self.raw_observation_vector_sizes.update({'Orders: timeliness': N_ord * 2})  # remaining time till order deadline, order deadline
+        # Order-count-independent alternative to operation and order blocks: fixed slots for the most urgent queued operations
+        self.raw_observation_vector_sizes.update({'Workstations: top-K queued operations': N_ws * self.observation_top_k * 4})  # per slot: occupied, remaining work, time till deadline, remaining operations
 
         self.agg_observation_vector_sizes.update({'Buffers: average fill level': N_ib + N_ob})  # from simulation start onwards
         self.agg_observation_vector_sizes.update({'Buffers: fill level variability': N_ib + N_ob})  # from simulation start onwards
@@ -1916,6 +2214,8 @@ class ProductionSystem():
         self.agg_observation_vector_sizes.update({'Workers: productive time ratio': N_w})  # from simulation start onwards: how much time status = BUSY (Haupttätigkeit)
         self.agg_observation_vector_sizes.update({'Workers: setup time ratio': N_w})  # from simulation start onwards: how much time status = SETTING_UP (Haupttätigkeit - Rüsten)
         self.agg_observation_vector_sizes.update({'Workers: walking time ratio': N_w})  # from simulation start onwards: how much time status = WALKING (Nebentätigkeit)
+        self.agg_observation_vector_sizes.update({'Workstations: queue summary': N_ws * 3})  # queue load, queued work, share of queued operations past deadline
+        self.agg_observation_vector_sizes.update({'Orders: summary': 4})  # planning period progress, released orders, finished product instances, open orders past deadline
         #self.agg_observation_vector_sizes.update({'Transport machines: material flow time ratio': N_tm})  # from simulation start onwards: how much time status = EXECUTING_TRANSPORT
         # Next KPI tells how short is the product's critical path compared to the time spent from the first operation till product is made
         #self.agg_observation_vector_sizes.update({'Products: critical path duration / flow time': N_P})  # from simulation start onwards: 1.0 if prod. time < CPD, afterwards CPD/PT
@@ -1960,13 +2260,22 @@ class ProductionSystem():
 
         self.prepare_order_tracker()
 
+        self.prepare_operation_instance_durations()
+
+        self.prepare_operation_processing_times()
+
         self.calculate_action_matrix_dimensions()
 
-        # Set the dimensions of action matrix
-        self.action_matrix = numpy.zeros((self.action_matrix_n_rows, self.action_matrix_n_cols), dtype="int32")
+        self.prepare_compact_action_index()
+
+        # Set the dimensions of the (flattened) action space
+        self.legal_action_mask = numpy.zeros(self.get_action_space_size(), dtype=bool)
 
         self.prepare_observation_space_dimensions()
 
+        # Resource states, inventories and pool trackers of the empty system, so that reset() starts every episode from the same state
+        self.initial_shop_floor_state = self.get_shop_floor_state(include_order_progress=False)
+
         self.is_prepared = True
 
 
@@ -2142,7 +2451,7 @@ class ProductionSystem():
 
     def apply_workstation_sequencing_heuristic(self, workstation_id, op_triple_list, heuristic):
         '''
-        Applies a workstation sequencing heuristic and directly calls set_action(), bypassing get_legal_actions().
+        Applies a workstation sequencing heuristic and returns the chosen integer action, bypassing get_legal_actions().
         Gets called from push_operation_downstream() if WORKSTATION_SEQUENCING is configured to be handled by a heuristic.
         '''
         # Old: To prevent any stochasticity here
@@ -2155,64 +2464,61 @@ class ProductionSystem():
 
         chosen_op_triple = ()
 
-        # Vector of alternative operation durations in seconds to enable LPT and SPT
-        op_durations = []
-        # Vector of deadlines to enable EDF
-        ord_deadlines = []
-        # Vector of numbers of remaining operations to finish the product to enable LOR and MOR
-        prod_remaining_ops = []
-
-        for op_triple in op_triple_list:
-            operation_id = op_triple[0]
-            product_id = op_triple[1]
-            order_id = op_triple[2]
-            for instance_data in self.order_progress[order_id]['product_progress']:
-                if instance_data['product_id'] == product_id:
-                    if instance_data['operation_progress'][operation_id]['status'] == OperationStatus.ASSIGNED:
-                        remaining_work = instance_data['operation_progress'][operation_id]['remaining_work']
-                        order_deadline = self.order_progress[order_id]['deadline']
-                        n_remaining_ops = 0
-                        for op_id, op_info_dict in instance_data['operation_progress'].items():
-                            if op_info_dict['remaining_work'] > 0:
-                                n_remaining_ops += 1
-                        op_durations.append(remaining_work)
-                        ord_deadlines.append(order_deadline)
-                        prod_remaining_ops.append(n_remaining_ops)
-                        break
-
-        if heuristic == 'FIFO':
-            chosen_op_triple = op_triple_list[0]
-
-        if heuristic == 'Longest processing time (LPT)':
-            chosen_op_triple = op_triple_list[numpy.argmax(op_durations)]
-
-        if heuristic == 'Shortest processing time (SPT)':
-            chosen_op_triple = op_triple_list[numpy.argmin(op_durations)]
-
-        if heuristic == 'Earliest deadline first (EDF)':
-            chosen_op_triple = op_triple_list[numpy.argmin(ord_deadlines)]
-
-        if heuristic == 'Least operations remaining (LOR)':
-            chosen_op_triple = op_triple_list[numpy.argmin(prod_remaining_ops)]
-
-        if heuristic == 'Most operations remaining (MOR)':
-            chosen_op_triple = op_triple_list[numpy.argmax(prod_remaining_ops)]
-
         if heuristic == 'Random':
             chosen_op_triple = op_triple_list[numpy.random.choice(range(len(op_triple_list)))]
+        else:
+            # Only the configured rule is evaluated, on attribute arrays built once per decision
+            priorities = WORKSTATION_SEQUENCING_RULES[heuristic](self.get_sequencing_candidate_attributes(workstation_id, op_triple_list), self.timestamp)
+            chosen_op_triple = op_triple_list[numpy.argmin(priorities)]
 
         op_str = chosen_op_triple[0] + '|' + chosen_op_triple[1] + '|' + chosen_op_triple[2]
         i = self.action_matrix_row_dict[op_str]
         j = self.action_matrix_col_dict[workstation_id]
-        action_int = i * self.action_matrix_n_cols + j
-        self.set_action(action_int)
+        return self.encode_action(i, j)
 
         # self.required_action_type = None --> actually happens in set_action() anyway
 
+    def get_sequencing_candidate_attributes(self, workstation_id, op_triple_list):
+        '''
+        Returns the attribute arrays of alternative operation triples at a workstation for the rules in WORKSTATION_SEQUENCING_RULES.
+        '''
+        # First queued product instance of each alternative at this workstation, looked up directly in instance_progress_index
+        queued_instances = {}
+        for op_quad in self.workstations[workstation_id].input_operation_buffer:
+            queued_instances.setdefault(op_quad[:3], op_quad[3])
+
+        n = len(op_triple_list)
+        candidates = {'queue_position': numpy.arange(n, dtype=float),
+                      'processing_time': numpy.zeros(n),  # remaining work of the operation in seconds
+                      'deadline': numpy.zeros(n),
+                      'remaining_operations': numpy.zeros(n),  # of the product instance
+                      'remaining_work': numpy.zeros(n),  # of the product instance
+                      'tail_length': numpy.zeros(n)}  # longest remaining path through the product graph from this operation on
+
+        for k, op_triple in enumerate(op_triple_list):
+            operation_id = op_triple[0]
+            product_id = op_triple[1]
+            order_id = op_triple[2]
+            instance_data = None
+            if op_triple in queued_instances.keys():
+                instance_data = self.instance_progress_index[(order_id, product_id, queued_instances[op_triple])]
+            else:
+                # Not queued at this workstation (yet), take the first assigned instance
+                for candidate_instance in self.order_progress[order_id]['product_progress']:
+                    if candidate_instance['product_id'] == product_id and candidate_instance['operation_progress'][operation_id]['status'] == OperationStatus.ASSIGNED:
+                        instance_data = candidate_instance
+                        break
+            if instance_data is not None:
+                candidates['processing_time'][k] = instance_data['operation_progress'][operation_id]['remaining_work']
+                candidates['remaining_operations'][k] = instance_data['remaining_operations']
+                candidates['remaining_work'][k] = instance_data['remaining_work']
+            candidates['deadline'][k] = self.order_progress[order_id]['deadline']
+            candidates['tail_length'][k] = self.operation_tail_lengths[(product_id, operation_id)]
+        return candidates
 
     def apply_workstation_routing_heuristic(self, op_quadruple, eligible_workstations, heuristic):
         '''
-        Applies a workstation routing heuristic and directly calls set_action(), bypassing get_legal_actions().
+        Applies a workstation routing heuristic and returns the chosen integer action, bypassing get_legal_actions().
         Gets called from push_operation_downstream() if WORKSTATION_ROUTING is configured to be handled by a heuristic.
         '''
         # To prevent any stochasticity here
@@ -2220,24 +2526,13 @@ class ProductionSystem():
 
         chosen_workstation = ''
 
+        candidates = [self.workstations[workstation_id] for workstation_id in eligible_workstations]
         # Vector of numbers of queued operations at workstations to enable LQO
-        queued_ops = []
+        queued_ops = numpy.array([len(workstation.input_operation_buffer) for workstation in candidates])
         # Vector of numbers of queued and currently processed operations at workstations to enable LQPO
-        queued_and_processed_ops = []
-        # Vector of queued time at workstations to enable LQT
-        queued_times = []
-
-        for workstation_id in eligible_workstations:
-            workstation : Workstation = self.workstations[workstation_id]
-            queued_ops.append(len(workstation.input_operation_buffer))
-            queued_and_processed_ops.append(len(workstation.input_operation_buffer) + len(workstation.wip_operations))
-            queued_time = 0.0
-            for op_quad in workstation.input_operation_buffer:
-                op_id = op_quad[0]
-                prod_id = op_quad[1]
-                op = self.find_operation_by_name(op_id, self.product_operations[prod_id])
-                queued_time += op.processing_time_value
-            queued_times.append(queued_time)
+        queued_and_processed_ops = queued_ops + numpy.array([len(workstation.wip_operations) for workstation in candidates])
+        # Vector of queued time at workstations to enable LQT (running counter, see Workstation.enqueue_operation())
+        queued_times = numpy.array([workstation.queued_processing_time for workstation in candidates])
 
         if heuristic == 'Least queued operations (LQO)':
             chosen_workstation = eligible_workstations[numpy.argmin(queued_ops)]
@@ -2253,8 +2548,7 @@ class ProductionSystem():
 
         i = self.action_matrix_row_dict[op_quadruple[0] + '|' + op_quadruple[1] + '|' + op_quadruple[2]]
         j = self.action_matrix_col_dict[chosen_workstation]
-        action_int = i * self.action_matrix_n_cols + j
-        self.set_action(action_int)
+        return self.encode_action(i, j)
 
 
     def push_operation_downstream(self, operation_id, product_id, order_id, product_instance, eligible_workstations, operation_progress, postponed=False):
@@ -2277,7 +2571,7 @@ class ProductionSystem():
             ws : Workstation = self.workstations[eligible_workstations[0]]
 
             if not postponed:
-                ws.input_operation_buffer.append((operation_id, product_id, order_id, product_instance))
+                ws.enqueue_operation((operation_id, product_id, order_id, product_instance), self.operation_processing_times[(product_id, operation_id)])
                 operation_progress[operation_id]['location'] = eligible_workstations[0]
                 operation_progress[operation_id]['status'] = OperationStatus.ASSIGNED
 
@@ -2372,11 +2666,12 @@ class ProductionSystem():
 
             # Apply a heuristic if so configured
             if self.action_config['Workstation sequencing'][0] == False:  # indirect action
-                self.apply_workstation_sequencing_heuristic(workstation_id=self.action_relevant_info[0],
-                                                            op_triple_list=self.action_relevant_info[1],
-                                                            heuristic=self.action_config['Workstation sequencing'][1])
+                self.pending_heuristic_action = self.apply_workstation_sequencing_heuristic(workstation_id=self.action_relevant_info[0],
+                                                                                            op_triple_list=self.action_relevant_info[1],
+                                                                                            heuristic=self.action_config['Workstation sequencing'][1])
 
             # Exit run_until_decision_point() back to set_action(), which will set the operation status to COMMITTED if the operation is chosen
+            # (a pending heuristic action is applied there as well)
             return True
         
         if len(eligible_workstations) > 1:
@@ -2387,9 +2682,9 @@ class ProductionSystem():
 
             # Apply a heuristic if so configured
             if self.action_config['Workstation routing'][0] == False:  # indirect action
-                self.apply_workstation_routing_heuristic(op_quadruple=self.action_relevant_info[0],
-                                                         eligible_workstations=self.action_relevant_info[1],
-                                                         heuristic=self.action_config['Workstation routing'][1])
+                self.pending_heuristic_action = self.apply_workstation_routing_heuristic(op_quadruple=self.action_relevant_info[0],
+                                                                                         eligible_workstations=self.action_relevant_info[1],
+                                                                                         heuristic=self.action_config['Workstation routing'][1])
 
             # set_action() will change the status of the chosen operation to ASSIGNED 
             return True
@@ -2433,6 +2728,8 @@ class ProductionSystem():
         '''
 
         print(f'\nTrying to process operation {operation_id}|{product_id}|{order_id}|{product_instance} at workstation {workstation.workstation_id}...')
+        # The observation blocks this changes are marked where the state is changed, the workstation status almost always changes
+        self.mark_observation_dirty(self.workstation_observations)
 
         # Are all components needed for this operation available in the workstation's physical input buffers or in the physical WIP?
         required_components = {}  # key: component name, value: quantity
@@ -2515,6 +2812,7 @@ class ProductionSystem():
         if all_components_available:
             print('    All required components are at the workstation.')
             print('    Moving all required components from PhIBs into Ph-WIP.')
+            self.mark_observation_dirty(self.buffer_observations)
             # Move all required components that are still in PhIBs, into Ph-WIP (wip_components)
             # See what is already in the wip_components
             components_available_in_wip = {}
@@ -2718,6 +3016,7 @@ class ProductionSystem():
 
                 # Actually put the tools "in use" to block them from being seized by other workstations or workers
                 workstation.tools_in_use = list(operation_node.tools.keys())
+                self.mark_observation_dirty(self.tool_observations)
                 print(f'    Tools in use after setup (future state): {str(workstation.tools_in_use)}')
                 workstation.seized_tools = [tid for tid in workstation.seized_tools if tid not in workstation.tools_in_use]
                 print(f'    Seized tools after setup (future state): {str(workstation.seized_tools)}')
@@ -2767,6 +3066,7 @@ class ProductionSystem():
                 if workstation.seized_worker != '':
                     print(f'    {workstation.seized_worker} is at the workstation to execute setup, setting their status to SETTING_UP.')
                     self.workers[workstation.seized_worker].status = WorkerStatus.SETTING_UP
+                    self.mark_observation_dirty(self.worker_observations)
                     self.workers[workstation.seized_worker].log_status_change(self.timestamp)
                     workstation.status.append(WorkstationStatus.SETUP)
                     print('    Added SETUP to workstation status list.')
@@ -2802,6 +3102,7 @@ class ProductionSystem():
             workstation.log_status_change(self.timestamp, (operation_id, product_id, order_id, product_instance))
             if len(all_required_worker_capabilities) > 0:
                 self.workers[workstation.seized_worker].status = WorkerStatus.BUSY
+                self.mark_observation_dirty(self.worker_observations)
                 print('    Set worker status to BUSY.')
                 self.workers[workstation.seized_worker].log_status_change(self.timestamp)
             operation_progress[operation_id]['status'] = OperationStatus.PROCESSING
@@ -2828,7 +3129,7 @@ class ProductionSystem():
 
     def apply_transport_routing_heuristic(self, source, eligible_transport, heuristic):
         '''
-        Applies a transport routing heuristic and directly calls set_action(), bypassing get_legal_actions().
+        Applies a transport routing heuristic and returns the chosen integer action, bypassing get_legal_actions().
         Gets called from handle_transport_order() if TRANSPORT_ROUTING is configured to be handled by a heuristic.
         '''
         chosen_transport = ''
@@ -2865,13 +3166,12 @@ class ProductionSystem():
 
         i = self.action_matrix_row_dict[chosen_transport]
         j = self.action_matrix_col_dict[source]
-        action_int = i * self.action_matrix_n_cols + j
-        self.set_action(action_int)
+        return self.encode_action(i, j)
 
 
     def apply_transport_sequencing_heuristic(self, transport_id, possible_targets, heuristic):
         '''
-        Applies a transport sequencing heuristic and directly calls set_action(), bypassing get_legal_actions().
+        Applies a transport sequencing heuristic and returns the chosen integer action, bypassing get_legal_actions().
         Gets called from handle_transport_order() if TRANSPORT_SEQUENCING is configured to be handled by a heuristic.
         '''
         # The "skip" option is not supported by heuristics
@@ -2910,8 +3210,7 @@ class ProductionSystem():
 
         i = self.action_matrix_row_dict[transport_id]
         j = self.action_matrix_col_dict[chosen_target]
-        action_int = i * self.action_matrix_n_cols + j
-        self.set_action(action_int)
+        return self.encode_action(i, j)
 
 
     def handle_transport_order(self, component_dict, source, destination, eligible_transport, postponed=False):
@@ -2958,9 +3257,9 @@ class ProductionSystem():
 
             # Apply a heuristic if so configured
             if self.action_config['Transport sequencing'][0] == False:  # indirect action
-                self.apply_transport_sequencing_heuristic(transport_id=self.action_relevant_info[0],
-                                                          possible_targets=self.action_relevant_info[1],
-                                                          heuristic=self.action_config['Transport sequencing'][1])
+                self.pending_heuristic_action = self.apply_transport_sequencing_heuristic(transport_id=self.action_relevant_info[0],
+                                                                                          possible_targets=self.action_relevant_info[1],
+                                                                                          heuristic=self.action_config['Transport sequencing'][1])
 
             return True
         
@@ -2971,9 +3270,9 @@ class ProductionSystem():
 
             # Apply a heuristic if so configured
             if self.action_config['Transport routing'][0] == False:  # indirect action
-                self.apply_transport_routing_heuristic(source=source,
-                                                       eligible_transport=eligible_transport,
-                                                       heuristic = self.action_config['Transport routing'][1])
+                self.pending_heuristic_action = self.apply_transport_routing_heuristic(source=source,
+                                                                                       eligible_transport=eligible_transport,
+                                                                                       heuristic=self.action_config['Transport routing'][1])
 
             return True
 
@@ -3159,18 +3458,44 @@ class ProductionSystem():
         return True
 
 
+    heuristic_action_types = {'Workstation routing': ActionType.WORKSTATION_ROUTING,
+                              'Workstation sequencing': ActionType.WORKSTATION_SEQUENCING,
+                              'Transport routing': ActionType.TRANSPORT_ROUTING,
+                              'Transport sequencing': ActionType.TRANSPORT_SEQUENCING}
+
+    @staticmethod
+    def get_heuristic_options():
+        '''Returns {decision type: [heuristic names]} of all heuristics available for indirect actions, including 'Random'.'''
+        return {'Workstation routing': ['Least queued operations (LQO)', 'Least queued and processed operations (LQPO)', 'Least queued time (LQT)', 'Random'],
+                'Workstation sequencing': list(WORKSTATION_SEQUENCING_RULES.keys()) + ['Random'],  # registered dispatching rules
+                'Transport routing': ['Closest transport (CT)', 'Least queued transport orders (LQTO)', 'Random'],
+                'Transport sequencing': ['Closest destination (CD)', 'FIFO', 'Random']}
+
+    @staticmethod
+    def get_heuristic_actions():
+        '''
+        Returns the dispatching rules selectable as actions with the 'heuristic' action encoding as list of (decision type, heuristic name),
+        i.e. all heuristics of get_heuristic_options() (including all registered sequencing rules) except 'Random'.
+        '''
+        return [(decision, heuristic) for decision, heuristics in ProductionSystem.get_heuristic_options().items()
+                for heuristic in heuristics if heuristic != 'Random']
+
     def get_legal_actions(self):
         '''Returns an integer list of all legal actions for the current state of the production system depending on the currently required action type.
+        Legal actions are generated directly from action_relevant_info and cached (together with legal_action_mask) until the state changes.
+        The returned list is the cached one and must not be modified by the caller.
         '''
+        if (self.legal_actions_cache is not None and
+            self.legal_actions_cache_key[0] == self.state_version and
+            self.legal_actions_cache_key[1] is self.required_action_type and
+            self.legal_actions_cache_key[2] is self.action_relevant_info):
+            return self.legal_actions_cache
 
-        legal_actions = []
-
-        # Empty the action matrix from any previous manipulations
-        self.action_matrix = numpy.zeros((self.action_matrix_n_rows, self.action_matrix_n_cols), dtype="int32")
+        legal_cells = []  # (row, column) coordinates in the action matrix
 
         if self.required_action_type is None:
             # In the very beginning of the simulation we first need to hit an event to even start deciding on anything. For this, dummy action -1 is used.
-            legal_actions = [-1]
+            pass
 
         if self.required_action_type == ActionType.WORKSTATION_ROUTING:
             operation = self.action_relevant_info[0]
@@ -3191,8 +3516,7 @@ class ProductionSystem():
             elif len(eligible_workstation_ids) > 1:
                 i = self.action_matrix_row_dict[operation_id + '|' + product_id + '|' + order_id]
                 for ews in eligible_workstation_ids:
-                    j = self.action_matrix_col_dict[ews]
-                    self.action_matrix[i][j] = 1
+                    legal_cells.append((i, self.action_matrix_col_dict[ews]))
             
         if self.required_action_type == ActionType.WORKSTATION_SEQUENCING:
             workstation_id = self.action_relevant_info[0]
@@ -3209,8 +3533,7 @@ class ProductionSystem():
                         if self.ignore_ws_skip:
                             continue
                         row = 'skip'
-                    i = self.action_matrix_row_dict[row]
-                    self.action_matrix[i][j] = 1
+                    legal_cells.append((self.action_matrix_row_dict[row], j))
 
         if self.required_action_type == ActionType.TRANSPORT_SEQUENCING:
             transport_id = self.action_relevant_info[0]
@@ -3221,8 +3544,7 @@ class ProductionSystem():
             else:
                 i = self.action_matrix_row_dict[transport_id]
                 for target in target_ids:
-                    j = self.action_matrix_col_dict[target]
-                    self.action_matrix[i][j] = 1
+                    legal_cells.append((i, self.action_matrix_col_dict[target]))
 
         if self.required_action_type == ActionType.TRANSPORT_ROUTING:
             source_id = self.action_relevant_info[1]
@@ -3233,37 +3555,127 @@ class ProductionSystem():
             else:
                 j = self.action_matrix_col_dict[source_id]
                 for tm in transport_ids:
-                    i = self.action_matrix_row_dict[tm]
-                    self.action_matrix[i][j] = 1
+                    legal_cells.append((self.action_matrix_row_dict[tm], j))
 
+        # Direct legal actions ("full picture"), ascending and without duplicates like a row-major scan of the action matrix
+        legal_actions = sorted(set([self.encode_action(i, j) for i, j in legal_cells]))
+        self.legal_cell_count = len(set(legal_cells))
 
-        # Direct legal actions ("full picture")
-        for i in range(self.action_matrix_n_rows):
-            for j in range(self.action_matrix_n_cols):
-                if self.action_matrix[i][j] == 1:
-                    legal_actions.append(i * self.action_matrix_n_cols + j)
+        # Indirect legal actions: all dispatching rules of the required decision type
+        if self.action_encoding == 'heuristic':
+            legal_actions = [a for a, (decision, heuristic) in enumerate(self.heuristic_actions) if self.heuristic_action_types[decision] == self.required_action_type]
 
-        # TODO: Indirect legal actions (heuristics) - just a different set of rules to deal with the same "full picture"
+        # Update the cached mask by only touching previously and currently legal entries
+        if self.legal_action_mask is None or len(self.legal_action_mask) != self.get_action_space_size():
+            self.legal_action_mask = numpy.zeros(self.get_action_space_size(), dtype=bool)
+        if self.legal_actions_cache is not None:
+            self.legal_action_mask[[a for a in self.legal_actions_cache if a >= 0]] = False
+        self.legal_action_mask[legal_actions] = True
 
+        if self.required_action_type is None:
+            legal_actions = [-1]
+
+        self.legal_actions_cache = legal_actions
+        self.legal_actions_cache_key = (self.state_version, self.required_action_type, self.action_relevant_info)
         return legal_actions
 
+    def get_forced_action(self):
+        '''
+        Returns the action to apply if the current decision has exactly one real option, otherwise None.
+        With the 'heuristic' action encoding every applicable dispatching rule picks the single option, so the first one is returned.
+        '''
+        legal_actions = self.get_legal_actions()
+        if legal_actions == [-1] or self.legal_cell_count != 1:
+            return None
+        return legal_actions[0]
+
+    def get_legal_action_mask(self):
+        '''
+        Returns the boolean mask over the flattened action space (True = legal) of the current decision.
+        The mask is cached and must not be modified by the caller.
+        '''
+        self.get_legal_actions()
+        return self.legal_action_mask
+
+    def bump_state_version(self, observed_variables=None):
+        '''
+        Called by set_action() and the simulation kernel whenever the state changes.
+        Legal actions, observation and done flag memoized for older state versions get recomputed on their next request.
+        observed_variables are the observation blocks whose underlying state changed (all if None, see mark_observation_dirty()).
+        '''
+        self.state_version += 1
+        self.mark_observation_dirty(observed_variables)
+        self.invalidate_legal_actions()
+
+    def invalidate_legal_actions(self):
+        '''Called by bump_state_version() whenever the pending decision may have changed.'''
+        if self.legal_actions_cache is not None and self.legal_action_mask is not None:
+            self.legal_action_mask[[a for a in self.legal_actions_cache if a >= 0]] = False
+        self.legal_actions_cache = None
+
 
     def set_action(self, action):
         '''Applies the provided integer action to the production system and updates it until the next action is needed.
+        With the 'heuristic' action encoding the action selects the dispatching rule that decides the current decision.
+        Decisions configured to be handled by heuristics are resolved here one after another
+        until a decision for the planning algorithm is reached (instead of nested set_action() calls).
+        '''
+        if self.action_encoding == 'heuristic' and action != -1:
+            action = self.get_heuristic_cell_action(action)
+        result = self.set_cell_action(action)
+        while self.pending_heuristic_action is not None:
+            action = self.pending_heuristic_action
+            self.pending_heuristic_action = None
+            result = self.set_cell_action(action)
+        return result
+
+    def get_heuristic_cell_action(self, action):
+        '''
+        Returns the cell action chosen by the dispatching rule heuristic_actions[action] for the currently required decision.
+        The rule has to belong to the required action type (see get_legal_actions()).
+        '''
+        decision, heuristic = self.heuristic_actions[action]
+        print(f'\n--> Setting heuristic action {action}: {decision} by {heuristic}')
+        if self.heuristic_action_types[decision] != self.required_action_type:
+            raise RuntimeError(f'Heuristic action {heuristic} for {decision} is not applicable to the required action type {self.required_action_type}')
+
+        if self.required_action_type == ActionType.WORKSTATION_ROUTING:
+            return self.apply_workstation_routing_heuristic(op_quadruple=self.action_relevant_info[0],
+                                                            eligible_workstations=self.action_relevant_info[1],
+                                                            heuristic=heuristic)
+        if self.required_action_type == ActionType.WORKSTATION_SEQUENCING:
+            # Heuristics don't skip, so an offer consisting only of 'skip' is taken as is
+            op_triple_list = [op for op in self.action_relevant_info[1] if op[0] != 'skip']
+            if len(op_triple_list) == 0:
+                return self.encode_action(self.action_matrix_row_dict['skip'], self.action_matrix_col_dict[self.action_relevant_info[0]])
+            return self.apply_workstation_sequencing_heuristic(workstation_id=self.action_relevant_info[0],
+                                                               op_triple_list=op_triple_list,
+                                                               heuristic=heuristic)
+        if self.required_action_type == ActionType.TRANSPORT_ROUTING:
+            return self.apply_transport_routing_heuristic(source=self.action_relevant_info[1],
+                                                          eligible_transport=self.action_relevant_info[3],
+                                                          heuristic=heuristic)
+        if self.required_action_type == ActionType.TRANSPORT_SEQUENCING:
+            possible_targets = [target for target in self.action_relevant_info[1] if target != 'skip']
+            if len(possible_targets) == 0:
+                return self.encode_action(self.action_matrix_row_dict[self.action_relevant_info[0]], self.action_matrix_col_dict['skip'])
+            return self.apply_transport_sequencing_heuristic(transport_id=self.action_relevant_info[0],
+                                                             possible_targets=possible_targets,
+                                                             heuristic=heuristic)
+
+    def set_cell_action(self, action):
+        '''Applies the provided integer action matrix cell to the production system and updates it until the next action is needed.
         '''
         print(f'\n--> Setting action {action}')
 
+        self.bump_state_version([] if action == -1 else self.action_observations.get(self.required_action_type))
+
         if action == -1:
             return self.run_until_decision_point()
         
-        j = action % self.action_matrix_n_cols
-        i = int((action - j) / self.action_matrix_n_cols)
+        i, j = self.decode_action(action)
 
         if self.required_action_type == ActionType.WORKSTATION_SEQUENCING:
-            # Erase all ones in the j-th column from the legal action matrix because only one operation is chosen 
-            for row in range(self.action_matrix_n_rows):
-                self.action_matrix[row][j] = 0
-
             operation_info_str = self.action_matrix_reverse_row_dict[i]
             print('WORKSTATION_SEQUENCING action:')
             print(f'    operation to process next: {operation_info_str}')
@@ -3309,7 +3721,7 @@ class ProductionSystem():
                         instance = rho[3]
                         break
                 # Remove the first instance matching the selected operation from the input operation buffer
-                ws.input_operation_buffer.remove((operation_id, product_id, order_id, instance))
+                ws.dequeue_operation((operation_id, product_id, order_id, instance), self.operation_processing_times[(product_id, operation_id)])
                 # Move the selected operation into workstation's wip_operations
                 ws.wip_operations.append((operation_id, product_id, order_id, instance))
                 # Set location and status of the operation
@@ -3374,7 +3786,7 @@ class ProductionSystem():
                     for k in range(max_num_inst):
                         instance_idx = instances[k]
                         # Remove the first instance matching the selected operation from the input operation buffer
-                        ws.input_operation_buffer.remove((operation_id, product_id, order_id, instance_idx))
+                        ws.dequeue_operation((operation_id, product_id, order_id, instance_idx), self.operation_processing_times[(product_id, operation_id)])
                         # Move the selected operation into workstation's wip_operations
                         ws.wip_operations.append((operation_id, product_id, order_id, instance_idx))
                         # Set location and status of the operation
@@ -3404,10 +3816,6 @@ class ProductionSystem():
                     return all(committed_all_batch_ops)
 
         if self.required_action_type == ActionType.WORKSTATION_ROUTING:
-            # Erase all ones in the i-th row of the action matrix because only one workstation gets chosen
-            for col in range(self.action_matrix_n_cols):
-                self.action_matrix[i][col] = 0
-
             operation_info_str = self.action_matrix_reverse_row_dict[i]
             print('WORKSTATION_ROUTING action:')
             print(f'    assigned operation: {operation_info_str}')
@@ -3448,10 +3856,6 @@ class ProductionSystem():
                     return self.push_operation_downstream(operation_id, product_id, order_id, product_instance, [location_info_str], instance_data['operation_progress'])
 
         if self.required_action_type == ActionType.TRANSPORT_ROUTING:
-            # Erase all ones in the j-th column from the legal action matrix because only one transport machine is chosen 
-            for row in range(self.action_matrix_n_rows):
-                self.action_matrix[row][j] = 0
-
             transport_id = self.action_matrix_reverse_row_dict[i]
             location_info_str = self.action_matrix_reverse_col_dict[j]
             print('TRANSPORT_ROUTING action:')
@@ -3480,10 +3884,6 @@ class ProductionSystem():
             return self.handle_transport_order(component_dict, source, destination, [transport_id])
 
         if self.required_action_type == ActionType.TRANSPORT_SEQUENCING:
-            # Erase all ones in the i-th row of the action matrix because only one destination (workstation or inventory) gets chosen
-            for col in range(self.action_matrix_n_cols):
-                self.action_matrix[i][col] = 0
-
             transport_id = self.action_relevant_info[0]
             location_info_str = self.action_matrix_reverse_col_dict[j]
             print('TRANSPORT_SEQUENCING action:')
@@ -3544,8 +3944,8 @@ class ProductionSystem():
                             for operation_id, operation_data in instance_data['operation_progress'].items():
                                 if operation_data['status'] == OperationStatus.PROCESSING:
                                     self.event_queue.appendleft(OperationFinishedEvent(timestamp=self.timestamp + operation_data['remaining_work'],
-                                                                                workstation=operation_data['location'],
-                                                                                operation_id=operation_id))
+                                                                                workstation=self.workstations[operation_data['location']],
+                                                                                operation_id=(operation_id, instance_data['product_id'], order_id, instance_data['product_instance'])))
                                     
                 for workstation_id, workstation in self.workstations.items():
                     if WorkstationStatus.SETUP in workstation.status:
@@ -3583,21 +3983,30 @@ class ProductionSystem():
                     if TransportMachineStatus.LOADING in transport_machine.status:
                         location = None
                         if transport_machine.current_location in self.workstations.keys():
-                            location = self.workstations[transport_machine.location]
+                            location = self.workstations[transport_machine.current_location]
                         elif transport_machine.current_location in self.inventories.keys():
-                            location = self.inventories[transport_machine.location]
+                            location = self.inventories[transport_machine.current_location]
+                        # The components being loaded were appended to the payload last, see execute_transport_order()
                         self.event_queue.append(LoadingFinishedEvent(timestamp=self.timestamp + transport_machine.remaining_handling_time,
                                                                      transport_machine=transport_machine,
-                                                                     location=location))
+                                                                     location=location,
+                                                                     objects=[transport_machine.payload[-1]]))
                     if TransportMachineStatus.UNLOADING in transport_machine.status:
-                        location = None
-                        if transport_machine.current_location in self.workstations.keys():
-                            location = self.workstations[transport_machine.location]
-                        elif transport_machine.current_location in self.inventories.keys():
-                            location = self.inventories[transport_machine.location]
+                        # The batch being unloaded is the first committed component en route to the current location, see execute_transport_order();
+                        # the UnloadingFinishedEvent handler expects the location as ID
+                        objects_to_remove = {'Component': '', 'Quantity': 0}
+                        for item in transport_machine.transport_order_list:
+                            if all([item['Destination'] == transport_machine.current_location,
+                                    item['Commitment'] == True,
+                                    item['En route'] == True]):
+                                if objects_to_remove['Component'] == '':
+                                    objects_to_remove['Component'] = item['Component']
+                                if item['Component'] == objects_to_remove['Component']:
+                                    objects_to_remove['Quantity'] += item['Quantity']
                         self.event_queue.append(UnloadingFinishedEvent(timestamp=self.timestamp + transport_machine.remaining_handling_time,
                                                                      transport_machine=transport_machine,
-                                                                     location=location))
+                                                                     location=transport_machine.current_location,
+                                                                     objects=[objects_to_remove]))
                         
                 # Generate all OrderReleaseEvents
                 for order_id, order_data in self.order_progress.items():
@@ -3647,6 +4056,8 @@ class ProductionSystem():
                 if earliest_timestamp >= self.end_timestamp:
                     # Simulation end time reached
                     self.timestamp = self.end_timestamp
+                    # Only the time-dependent observation blocks change
+                    self.bump_state_version([])
                     print('!!! Main simulation loop has processed all events in the event queue !!!')
                     break
                 else:
@@ -3694,6 +4105,9 @@ class ProductionSystem():
                         earliest_event = event
                         # Simulation time jumps to the timestamp of this earliest event
                         self.timestamp = event.timestamp
+                        # Only the observation blocks the event handler changes get rewritten,
+                        # work_on_operation() marks the blocks it changes itself
+                        self.bump_state_version(self.event_observations.get(type(event)))
                         # Coinciding events are dealt with in FIFO order
                         break
 
@@ -3801,13 +4215,11 @@ class ProductionSystem():
                         # Populate list of simultaneously finished operations quadruple symbols
                         _finished_ops.append(o)
 
-                    clone_workstation_1 = deepcopy(workstation)
-                    clone_workstation_2 = deepcopy(workstation)
-
-                    obj_single_move_results = [clone_workstation_1.move_objects_to_physical_output_buffer(objects_to_move=[_op_prod], production_system=self) for _op_prod in _operation_products]
+                    # Plan the moves on hypothetical buffer occupancies instead of trial-moving on workstation copies
+                    obj_single_move_results = workstation.plan_moves_to_physical_output_buffers(objects_to_move=_operation_products, production_system=self)
 
                     # Need to bundle same components in case of quantity steps >1 in the physical output buffer
-                    obj_bundle_move_results = [clone_workstation_2.move_objects_to_physical_output_buffer(objects_to_move=[_op_prod], production_system=self) for _op_prod in _bundled_op_prods]
+                    obj_bundle_move_results = workstation.plan_moves_to_physical_output_buffers(objects_to_move=_bundled_op_prods, production_system=self)
 
                     # Rewrite products_moved_to_output (first entry) of obj_single_move_results to iterate over it later
                     for bmr in obj_bundle_move_results:
@@ -3868,6 +4280,9 @@ class ProductionSystem():
                         for instance_data in instances:
                             if instance_data['product_id'] == o[1] and instance_data['product_instance'] == o[3]:
                                 instance_data['operation_progress'][o[0]]['status'] = OperationStatus.DONE
+                                if instance_data['operation_progress'][o[0]]['remaining_work'] > 0:
+                                    instance_data['remaining_operations'] -= 1
+                                    instance_data['remaining_work'] -= instance_data['operation_progress'][o[0]]['remaining_work']
                                 instance_data['operation_progress'][o[0]]['remaining_work'] = 0
 
                                 print(f'Removing operation {str(o)} from the WIP of workstation {workstation.workstation_id}')
@@ -4433,6 +4848,9 @@ class ProductionSystem():
                     # Handle transport order, i.e. trigger TRANSPORT_ROUTING or TRANSPORT_SEQUENCING
                     self.event_queue.remove(earliest_event)
                     self.handle_transport_order(earliest_event.component_dict, source, destination, eligible_transport)  # return?
+                    if self.pending_heuristic_action is not None:
+                        # Let set_action() apply the heuristic decision before any further events are handled
+                        return True
                     
                 elif isinstance(earliest_event, LoadingFinishedEvent):
                     print(f'\nHandling LoadingFinishedEvent of transport machine {earliest_event.transport_machine.machine_id}')
@@ -4558,6 +4976,9 @@ class ProductionSystem():
                         self.event_queue.remove(earliest_event)
                     except ValueError:
                         print('    UnloadingFinishedEvent already deleted.')
+                    if self.pending_heuristic_action is not None:
+                        # Let set_action() apply the heuristic decision before any further events are handled
+                        return True
 
                 elif isinstance(earliest_event, ToolsRequest):
                     target_workstation : Workstation = earliest_event.target_workstation
@@ -4754,15 +5175,7 @@ class ProductionSystem():
         # Any action except -1 is set by RL here
         self.set_action(action)
 
-        # Possible situation: all events have been processed,
-        # only action "-1" remains but the timestamp has not yet reached
-        # the end timestamp.
-        while self.get_legal_actions() == [-1]:
-            if self.timestamp < self.end_timestamp:
-                self.set_action(-1)
-            else:
-                # Simulation end time reached
-                break
+        forced_decisions = self.advance_to_decision_point()
 
         done = self.is_done()
 
@@ -4773,266 +5186,332 @@ class ProductionSystem():
 
             self.event_queue.clear()  # doing so in reset() breaks the simulation for some reason
 
-            for kpi in self.reward_config.keys():
-                # reward_dict[kpi_name] = (goal, scale_value, unit)
+            reward = self.get_episode_reward()
 
-                if self.reward_config[kpi][0] != "Ignore":
+        info = {'forced_decisions': forced_decisions} if self.auto_resolve_forced_decisions else None
+        return self.get_obs(), reward, done, info
 
-                    goal_factor = 0
-                    if self.reward_config[kpi][0] == "Reward":
-                        goal_factor = 1
-                    elif self.reward_config[kpi][0] == "Punish":
-                        goal_factor = -1
-
-                    scale_value = self.reward_config[kpi][1]
-                    unit = self.reward_config[kpi][2]
-
-                    points = 0.0
+    def advance_to_decision_point(self):
+        '''
+        Runs the production system until a decision with a real choice is pending or the end timestamp is reached.
+        Returns the number of forced decisions applied on the way (see auto_resolve_forced_decisions).
+        '''
+        # Possible situation: all events have been processed,
+        # only action "-1" remains but the timestamp has not yet reached
+        # the end timestamp.
+        # Decisions with a single real option are applied here if so configured,
+        # the reward is only granted at the end of the episode, so nothing gets lost by skipping them.
+        forced_decisions = 0
+        while True:
+            if self.get_legal_actions() == [-1]:
+                if self.timestamp < self.end_timestamp:
+                    self.set_action(-1)
+                else:
+                    # Simulation end time reached
+                    break
+            elif self.auto_resolve_forced_decisions and self.get_forced_action() is not None:
+                forced_decisions += 1
+                self.set_action(self.get_forced_action())
+            else:
+                # Decision point with a real choice
+                break
+        self.forced_decision_count += forced_decisions
+        return forced_decisions
+
+    # KPIs of the reward configuration, the time KPIs are scaled by a duration with unit, the others by a plain value
+    reward_kpis = ['Mean order lead time',
+                   'Mean absolute order deadline deviation',
+                   'Mean productive time ratio of workstations',
+                   'Mean productive time ratio of workers',
+                   'Mean buffer fill variability factor']
+    time_reward_kpis = ['Mean order lead time', 'Mean absolute order deadline deviation']
+
+    def get_kpi_values(self, kpis=None):
+        '''
+        Returns {KPI name: value} of a finished episode for the given KPIs (default: all reward_kpis).
+        Time KPIs are in seconds, productive time ratios and the buffer fill variability factor are plain ratios.
+        '''
+        kpi_values = {}
+        for kpi in (self.reward_kpis if kpis is None else kpis):
+
+            if kpi in self.time_reward_kpis:
+
+                # Both time KPIs are based on order completion
+                total = 0
+                N_ord = len(self.order_list.order_list)
+
+                for order_id, order_info in self.order_progress.items():
+                    # If all product instances within this order have non-None production end times,
+                    # then get the maximum production end time as order completion timestamp.
+                    # If some of product instances aren't completed before planning horizon,
+                    # sum their remaining work and add to planning horizon to punish such delays strongly
+                    # while still providing information on whether the algorithm gets closer to
+                    # squeezing all operations within the planning horizon
+                    latest_instance_completion = 0
+                    worst_delay_beyond_sim_end = 0
+                    order_incomplete = False
+                    for instance in order_info['product_progress']:
+                        if instance['production_end_time'] is not None:
+                            if instance['production_end_time'] > latest_instance_completion:
+                                latest_instance_completion = instance['production_end_time']
+                        else:
+                            order_incomplete = True
+                            worst_delay_beyond_sim_end += sum([instance['operation_progress'][oid]['remaining_work'] for oid in instance['operation_progress'].keys()])
 
                     if kpi == 'Mean order lead time':
+                        if not order_incomplete:
+                            total += latest_instance_completion - order_info['release_time']
+                        elif order_incomplete:
+                            total += self.end_timestamp + worst_delay_beyond_sim_end - order_info['release_time']
+                    elif kpi == 'Mean absolute order deadline deviation':
+                        if not order_incomplete:
+                            total += abs(latest_instance_completion - order_info['deadline'])
+                        elif order_incomplete:
+                            total += self.end_timestamp + worst_delay_beyond_sim_end - order_info['deadline']
 
-                        mean_order_lead_time = 0
-                        N_ord = len(self.order_list.order_list)
-
-                        for order_id, order_info in self.order_progress.items():
-                            # If all product instances within this order have non-None production end times,
-                            # then get the maximum production end time as order completion timestamp.
-                            # If some of product instances aren't completed before planning horizon,
-                            # sum their remaining work and add to planning horizon to punish such delays strongly
-                            # while still providing information on whether the algorithm gets closer to
-                            # squeezing all operations within the planning horizon
-                            latest_instance_completion = 0
-                            worst_delay_beyond_sim_end = 0
-                            order_incomplete = False
-                            for instance in order_info['product_progress']:
-                                if instance['production_end_time'] is not None:
-                                    if instance['production_end_time'] > latest_instance_completion:
-                                        latest_instance_completion = instance['production_end_time']
-                                else:
-                                    order_incomplete = True
-                                    worst_delay_beyond_sim_end += sum([instance['operation_progress'][oid]['remaining_work'] for oid in instance['operation_progress'].keys()])
-
-                            if not order_incomplete:
-                                mean_order_lead_time += latest_instance_completion - order_info['release_time']
-                            elif order_incomplete:
-                                mean_order_lead_time += self.end_timestamp + worst_delay_beyond_sim_end - order_info['release_time']
-
-                        mean_order_lead_time /= N_ord
-
-                        points = mean_order_lead_time / self.get_int_seconds(scale_value, unit)
+                kpi_values[kpi] = total / N_ord
 
-                    if kpi == 'Mean absolute order deadline deviation':
+            elif kpi == 'Mean productive time ratio of workstations':
 
-                        ma_deadline_dev = 0
-                        N_ord = len(self.order_list.order_list)
+                mean_ws_util = 0.0
 
-                        for order_id, order_info in self.order_progress.items():
-                            latest_instance_completion = 0
-                            worst_delay_beyond_sim_end = 0
-                            order_incomplete = False
-                            for instance in order_info['product_progress']:
-                                if instance['production_end_time'] is not None:
-                                    if instance['production_end_time'] > latest_instance_completion:
-                                        latest_instance_completion = instance['production_end_time']
-                                else:
-                                    order_incomplete = True
-                                    worst_delay_beyond_sim_end += sum([instance['operation_progress'][oid]['remaining_work'] for oid in instance['operation_progress'].keys()])
+                elapsed = self.end_timestamp - self.start_timestamp
+                for ws in self.workstations.values():
+                    prod_ratio = 0.0
+                    if elapsed > 0:
+                        prod_ratio = ws.busy_time / elapsed if hasattr(ws, "busy_time") else 0.0
+                    mean_ws_util += prod_ratio
 
-                            if not order_incomplete:
-                                ma_deadline_dev += abs(latest_instance_completion - order_info['deadline'])
-                            elif order_incomplete:
-                                ma_deadline_dev += self.end_timestamp + worst_delay_beyond_sim_end - order_info['deadline']
+                kpi_values[kpi] = mean_ws_util / len(self.workstations) if self.workstations else 0.0
 
-                        ma_deadline_dev /= N_ord
+            elif kpi == 'Mean productive time ratio of workers':
 
-                        points = ma_deadline_dev / self.get_int_seconds(scale_value, unit)
+                mean_worker_util = 0.0
 
-                    if kpi == 'Mean productive time ratio of workstations':
+                elapsed = self.end_timestamp - self.start_timestamp
+                for worker in self.workers.values():
+                    prod_ratio = 0.0
+                    if elapsed > 0:
+                        prod_ratio = worker.busy_time / elapsed if hasattr(worker, "busy_time") else 0
+                    mean_worker_util += prod_ratio
 
-                        mean_ws_util = 0.0
+                kpi_values[kpi] = mean_worker_util / len(self.workers) if self.workers else 0.0
 
-                        elapsed = self.end_timestamp - self.start_timestamp
-                        for ws in self.workstations.values():
-                            prod_ratio = 0.0
-                            if elapsed > 0:
-                                prod_ratio = ws.busy_time / elapsed if hasattr(ws, "busy_time") else 0.0
-                            mean_ws_util += prod_ratio
+            elif kpi == 'Mean buffer fill variability factor':
 
-                        mean_ws_util /= len(self.workstations)
+                buffer_vars = []
 
-                        points = mean_ws_util / scale_value
+                for ws_id, ws in self.workstations.items():
+                    for buf_idx, buf in list(ws.physical_input_buffers.items()) + list(ws.physical_output_buffers.items()):
+                        buffer_vars.append(buf.get_fill_level_variability())
 
-                    if kpi == 'Mean productive time ratio of workers':
+                kpi_values[kpi] = sum(buffer_vars) / len(buffer_vars) if buffer_vars else 0.0
 
-                        mean_worker_util = 0.0
+        return kpi_values
 
-                        elapsed = self.end_timestamp - self.start_timestamp
-                        for worker in self.workers.values():
-                            prod_ratio = 0.0
-                            if elapsed > 0:
-                                prod_ratio = worker.busy_time / elapsed if hasattr(worker, "busy_time") else 0
-                            mean_worker_util += prod_ratio
+    def get_episode_reward(self):
+        '''
+        Returns the reward of a finished episode according to reward_config.
+        '''
+        reward = 0.0
 
-                        mean_worker_util /= len(self.workers)
+        # reward_dict[kpi_name] = (goal, scale_value, unit)
+        kpis = [kpi for kpi in self.reward_config.keys() if self.reward_config[kpi][0] != "Ignore"]
+        kpi_values = self.get_kpi_values(kpis)
 
-                        points = mean_worker_util / scale_value
+        for kpi in kpis:
 
-                    if kpi == 'Mean buffer fill variability factor':
+            goal_factor = 0
+            if self.reward_config[kpi][0] == "Reward":
+                goal_factor = 1
+            elif self.reward_config[kpi][0] == "Punish":
+                goal_factor = -1
 
-                        buffer_vars = []
-                        mean_buffer_var = 0.0
+            scale_value = self.reward_config[kpi][1]
+            unit = self.reward_config[kpi][2]
 
-                        for ws_id, ws in self.workstations.items():
-                            for buf_idx, buf in list(ws.physical_input_buffers.items()) + list(ws.physical_output_buffers.items()):
-                                buffer_vars.append(buf.get_fill_level_variability())
+            points = 0.0
 
-                        mean_buffer_var = sum(buffer_vars) / len(buffer_vars)
+            if kpi in self.time_reward_kpis:
+                points = kpi_values[kpi] / self.get_int_seconds(scale_value, unit)
+            elif kpi in kpi_values.keys():
+                points = kpi_values[kpi] / scale_value
 
-                        points = mean_buffer_var / scale_value
+            reward += goal_factor * points
 
-                    reward += goal_factor * points                            
+        return reward
 
-        return self.get_obs(), reward, done, None
+    def run_episode(self, policy, record=True, reset=True, capacity=1024):
+        '''
+        Runs a whole episode inside the kernel. policy(observation, legal action mask) returns the action and is only called
+        at decision points with a real choice (forced decisions are applied without asking if auto_resolve_forced_decisions is set).
+        Both arguments are cached arrays of the kernel that must not be modified and are overwritten after the call.
+        If record is True, the trajectory is written into preallocated arrays (grown by doubling from capacity).
+        Returns a dict with the episode reward, the number of decisions and forced decisions and, if recorded,
+        'observations' (n x observation size), 'action_masks' (n x action space size), 'actions' and 'rewards' (n).
+        '''
+        if reset:
+            self.reset()
+
+        observations = None
+        action_masks = None
+        actions = None
+        rewards = None
+        n = 0
+        forced_decisions = self.advance_to_decision_point()
+        while not self.is_done():
+            observation = self.get_obs()
+            mask = self.get_legal_action_mask()
+            action = policy(observation, mask)
+            if record:
+                if observations is None:
+                    observations = numpy.zeros((capacity, observation.size), dtype=numpy.float32)
+                    action_masks = numpy.zeros((capacity, mask.size), dtype=bool)
+                    actions = numpy.zeros(capacity, dtype=numpy.int64)
+                    rewards = numpy.zeros(capacity, dtype=numpy.float64)
+                if n == len(actions):
+                    observations = numpy.concatenate([observations, numpy.zeros_like(observations)])
+                    action_masks = numpy.concatenate([action_masks, numpy.zeros_like(action_masks)])
+                    actions = numpy.concatenate([actions, numpy.zeros_like(actions)])
+                    rewards = numpy.concatenate([rewards, numpy.zeros_like(rewards)])
+                observations[n] = observation.reshape(-1)
+                action_masks[n] = mask
+                actions[n] = action
+            n += 1
+            self.set_action(action)
+            forced_decisions += self.advance_to_decision_point()
+
+        print('ProductionSystem: done')
+        self.event_queue.clear()  # see step()
+        episode_reward = self.get_episode_reward()
+
+        result = {'episode_reward': episode_reward, 'decisions': n, 'forced_decisions': forced_decisions}
+        if record:
+            if observations is None:
+                observations = numpy.zeros((0, len(self.observation_buffer) if self.observation_buffer is not None else 0), dtype=numpy.float32)
+                action_masks = numpy.zeros((0, self.get_action_space_size()), dtype=bool)
+                actions = numpy.zeros(0, dtype=numpy.int64)
+                rewards = numpy.zeros(0, dtype=numpy.float64)
+            elif n > 0:
+                # The reward is granted for the last decision of the episode
+                rewards[n - 1] = episode_reward
+            result.update({'observations': observations[:n], 'action_masks': action_masks[:n], 'actions': actions[:n], 'rewards': rewards[:n]})
+        return result
+
+    def step_joint(self, action, select_action):
+        '''
+        Applies the action and answers all further decisions that arise at the same timestamp,
+        so that the planning algorithm sees them as one joint transition.
+        Decisions at the same timestamp depend on each other (e.g. a routed operation changes the queue the next routing
+        decision sees), so they only become known one after another: select_action(observation, action type, legal action mask)
+        is called for each of them, e.g. a cheap policy forward pass instead of a full search per decision.
+        Returns the observation after the batch, the summed reward, the done flag and
+        info = {'decisions': [(action type, action), ...], 'forced_decisions': int}.
+        '''
+        batch_timestamp = self.timestamp
+        decisions = []  # (action type, action)
+        reward_sum = 0.0
+        forced_decisions = 0
+        while True:
+            decisions.append((self.required_action_type, action))
+            obs, reward, done, info = self.step(action)
+            reward_sum += reward
+            if info is not None:
+                forced_decisions += info['forced_decisions']
+            if done or self.timestamp != batch_timestamp:
+                break
+            action = select_action(obs, self.required_action_type, self.get_legal_action_mask())
+        return obs, reward_sum, done, {'decisions': decisions, 'forced_decisions': forced_decisions}
 
     def get_obs(self):
         '''Returns the observation of the production system at its current state.
+        Only the blocks of the preallocated observation buffer whose state changed since the last call are rewritten.
+        Memoized per state version, the returned array must not be modified by the caller.
         '''
-        elements = []
+        if self.obs_cache is not None and self.obs_cache[0] == self.state_version:
+            return self.obs_cache[1]
+
+        self.prepare_observation_buffer()
+
+        # Time-dependent blocks change whenever the simulation time moves on
+        if self.observation_timestamp != self.timestamp:
+            for var in self.time_dependent_observations:
+                if var in self.observation_dirty.keys():
+                    self.observation_dirty[var] = True
+            self.observation_timestamp = self.timestamp
 
         # --- Raw state variables --- #
 
         for var in self.raw_observation_vector_sizes.keys():
 
-            if self.observation_config[var][1]:
+            if self.observation_dirty.get(var, False):
+                block = self.observation_buffer[self.observation_block_offsets[var][0]:self.observation_block_offsets[var][1]]
+                self.observation_dirty[var] = False
 
                 # Make sure these are the same as in prepare_observation_space_dimensions()
+                # One-hot blocks are filled with a single fancy-indexing assignment from index arrays (-1: not applicable)
                 if var == 'Workers: location (workstation)':
-                    N_w = len(self.workers)
-                    N_ws = len(self.workstations)
-                    w_ws_mat = numpy.zeros((N_w, N_ws), dtype=numpy.float32)
-                    i = 0
-                    for w_id, w in self.workers.items():
-                        j = 0
-                        for ws_id, ws in self.workstations.items():
-                            if w.location == ws_id:
-                                w_ws_mat[i,j] = 1.0
-                            j = j + 1
-                        i = i + 1
-                    w_ws_flat = w_ws_mat.flatten()
-                    elements.append(w_ws_flat)
+                    self.fill_one_hot_block(block, len(self.workers), len(self.workstations),
+                                            self.get_observation_index_array([w.location for w in self.workers.values()], 'workstations'))
 
                 if var == 'Workers: location (transport)':
-                    N_w = len(self.workers)
-                    N_tm = len(self.transport_machines)
-                    w_tm_mat = numpy.zeros((N_w, N_tm), dtype=numpy.float32)
-                    i = 0
-                    for w_id, w in self.workers.items():
-                        j = 0
-                        for tm_id, tm in self.transport_machines.items():
-                            if w.location == tm_id:
-                                w_tm_mat[i,j] = 1.0
-                            j = j + 1
-                        i = i + 1
-                    w_tm_flat = w_tm_mat.flatten()
-                    elements.append(w_tm_flat)
+                    self.fill_one_hot_block(block, len(self.workers), len(self.transport_machines),
+                                            self.get_observation_index_array([w.location for w in self.workers.values()], 'transport_machines'))
 
                 if var == 'Workers: destination (workstation)':
-                    N_w = len(self.workers)
-                    N_ws = len(self.workstations)
-                    w_ws_dest_mat = numpy.zeros((N_w, N_ws), dtype=numpy.float32)
-                    i = 0
-                    for w_id, w in self.workers.items():
-                        j = 0
-                        for ws_id, ws in self.workstations.items():
-                            if w.destination == ws_id:
-                                w_ws_dest_mat[i,j] = 1.0
-                            j = j + 1
-                        i = i + 1
-                    w_ws_dest_flat = w_ws_dest_mat.flatten()
-                    elements.append(w_ws_dest_flat)
+                    self.fill_one_hot_block(block, len(self.workers), len(self.workstations),
+                                            self.get_observation_index_array([w.destination for w in self.workers.values()], 'workstations'))
 
                 if var == 'Workers: destination (transport)':
-                    N_w = len(self.workers)
-                    N_tm = len(self.transport_machines)
-                    w_tm_dest_mat = numpy.zeros((N_w, N_tm), dtype=numpy.float32)
-                    i = 0
-                    for w_id, w in self.workers.items():
-                        j = 0
-                        for tm_id, tm in self.transport_machines.items():
-                            if w.destination == tm_id:
-                                w_tm_dest_mat[i,j] = 1.0
-                            j = j + 1
-                        i = i + 1
-                    w_tm_dest_flat = w_tm_dest_mat.flatten()
-                    elements.append(w_tm_dest_flat)
+                    self.fill_one_hot_block(block, len(self.workers), len(self.transport_machines),
+                                            self.get_observation_index_array([w.destination for w in self.workers.values()], 'transport_machines'))
 
                 if var == 'Workers: status':
-                    N_w = len(self.workers)
-                    w_status_mat = numpy.zeros((N_w, 4), dtype=numpy.float32)
-                    i = 0
-                    for w_id, w in self.workers.items():
-                        w_status_mat[i,w.status-1] = 1.0
-                        i = i + 1
-                    w_status_flat = w_status_mat.flatten()
-                    elements.append(w_status_flat)
-
-                if var == 'Tools: location':
-                    N_t = len(self.tools)
-                    N_ws = len(self.workstations)
-                    tool_loc_mat = numpy.zeros((N_t, N_ws), dtype=numpy.float32)
-                    j = 0
-                    for ws_id, ws in self.workstations.items():
-                        i = 0
-                        for tool_id, tool in self.tool_state_tracker.items():
-                            if any([tool_id in ws.permanent_tools,
-                                    tool_id in ws.seized_tools,
-                                    tool_id in ws.tools_in_use]):
-                                tool_loc_mat[i,j] = 1.0
-                            i = i + 1
-                        j = j + 1
-                    tool_loc_flat = tool_loc_mat.flatten()
-                    elements.append(tool_loc_flat)
-
-                if var == 'Tools: status':
-                    N_t = len(self.tools)
-                    tool_status_mat = numpy.zeros((N_t, 3), dtype=numpy.float32)
-                    i = 0
-                    for tool_id, tool in self.tool_state_tracker.items():
-                        for ws_id, ws in self.workstations.items():
-                            if tool_id in ws.seized_tools:
-                                tool_status_mat[i,0] = 1.0
-                            if tool_id in ws.permanent_tools:
-                                tool_status_mat[i,1] = 1.0
-                            if tool_id in ws.tools_in_use:
-                                tool_status_mat[i,2] = 1.0
-                        i = i + 1
-                    tool_status_flat = tool_status_mat.flatten()
-                    elements.append(tool_status_flat)
+                    self.fill_one_hot_block(block, len(self.workers), 4,
+                                            numpy.fromiter((w.status - 1 for w in self.workers.values()), dtype=numpy.int64, count=len(self.workers)))
+
+                if var == 'Tools: location' or var == 'Tools: status':
+                    # Collect (tool row, workstation column, status column) for every tool held by a workstation
+                    tool_idx_map = self.observation_index_maps['tools']
+                    tool_rows = []
+                    ws_cols = []
+                    status_cols = []
+                    for j, ws in enumerate(self.workstations.values()):
+                        for status_col, tool_list in enumerate([ws.seized_tools, ws.permanent_tools, ws.tools_in_use]):
+                            for tool_id in tool_list:
+                                if tool_id in tool_idx_map.keys():
+                                    tool_rows.append(tool_idx_map[tool_id])
+                                    ws_cols.append(j)
+                                    status_cols.append(status_col)
+                    if var == 'Tools: location':
+                        tool_loc_mat = block.reshape(len(self.tool_state_tracker), len(self.workstations))
+                        tool_loc_mat[:] = 0.0
+                        tool_loc_mat[tool_rows, ws_cols] = 1.0
+                    else:
+                        tool_status_mat = block.reshape(len(self.tool_state_tracker), 3)
+                        tool_status_mat[:] = 0.0
+                        tool_status_mat[tool_rows, status_cols] = 1.0
 
                 if var == 'Workstations: status':
-                    N_ws = len(self.workstations)
-                    ws_status_mat = numpy.zeros((N_ws, 11), dtype=numpy.float32)
-                    i = 0
-                    for ws_id, ws in self.workstations.items():
-                        for s in ws.status:
-                            ws_status_mat[i,s-1] = 1.0
-                        i = i + 1
-                    ws_status_flat = ws_status_mat.flatten()
-                    elements.append(ws_status_flat)
+                    ws_status_mat = block.reshape(len(self.workstations), 11)
+                    ws_status_mat[:] = 0.0
+                    ws_rows = [i for i, ws in enumerate(self.workstations.values()) for s in ws.status]
+                    status_cols = [s - 1 for ws in self.workstations.values() for s in ws.status]
+                    ws_status_mat[ws_rows, status_cols] = 1.0
 
                 if var == 'Input buffers: fill level':
                     ib_fill_list = []
                     for ws in self.workstations.values():
                         for ib in ws.physical_input_buffers.values():
                             ib_fill_list.append(ib.get_fill_level())
-                    elements.append(numpy.array(ib_fill_list))
+                    block[:] = numpy.array(ib_fill_list)
                 
                 if var == 'Output buffers: fill level':
                     ob_fill_list = []
                     for ws in self.workstations.values():
                         for ob in ws.physical_output_buffers.values():
                             ob_fill_list.append(ob.get_fill_level())
-                    elements.append(numpy.array(ob_fill_list))
+                    block[:] = numpy.array(ob_fill_list)
 
                 if var == 'Operations: location (workstation)':
                     N_op = 0
@@ -5040,7 +5519,7 @@ class ProductionSystem():
                         for product_id, product_quantity in order.products.items():
                             N_op += product_quantity * len(self.product_operations[product_id])
                     N_ws = len(self.workstations)
-                    ws_idx_map = {key: m for m, key in enumerate(self.workstations)}
+                    ws_idx_map = self.observation_index_maps['workstations']
                     op_loc_mat = numpy.zeros((N_op, N_ws), dtype=numpy.float32)
                     i = 0
                     for order in self.order_progress.values():
@@ -5051,53 +5530,63 @@ class ProductionSystem():
                                     op_loc_mat[i,j] = 1.0
                                 i = i + 1
                     op_loc_flat = op_loc_mat.flatten()
-                    elements.append(op_loc_flat)
+                    block[:] = op_loc_flat
 
                 if var == 'Operations: remaining work':
-                    rem_work = []
-                    for order in self.order_progress.values():
-                        for instance in order['product_progress']:
-                            product_id = instance['product_id']
-                            for operation_id, operation in instance['operation_progress'].items():
-                                pt_value = self.find_operation_by_name(operation_id, self.product_operations[product_id]).processing_time_value
-                                pt_unit = self.find_operation_by_name(operation_id, self.product_operations[product_id]).processing_time_unit
-                                operation_duration = self.get_int_seconds(pt_value, pt_unit)
-                                rem_work.append(operation['remaining_work']/operation_duration)
-                    elements.append(numpy.array(rem_work))
+                    rem_work = numpy.fromiter((operation['remaining_work']
+                                               for order in self.order_progress.values()
+                                               for instance in order['product_progress']
+                                               for operation in instance['operation_progress'].values()),
+                                              dtype=numpy.float64, count=len(self.operation_instance_durations))
+                    block[:] = rem_work / self.operation_instance_durations
+
+                if var == 'Workstations: top-K queued operations':
+                    # Most urgent queued operations per workstation (earliest deadline, then least remaining work) in fixed slots,
+                    # empty slots stay all zeros
+                    slots_mat = block.reshape(len(self.workstations), self.observation_top_k, 4)
+                    slots_mat[:] = 0.0
+                    for i, ws in enumerate(self.workstations.values()):
+                        queued_features = self.get_queued_operation_features(ws)[:self.observation_top_k]
+                        if queued_features:
+                            slots_mat[i, :len(queued_features), 0] = 1.0
+                            slots_mat[i, :len(queued_features), 1:] = [f[1:] for f in queued_features]
 
                 if var == 'Orders: timeliness':
                     # 1. Remaining time till order deadline relative to planning period duration
                     # 2. Order deadline relative to planning period duration
                     N_ord = len(self.order_list.order_list)
                     order_timeliness_mat = numpy.zeros((N_ord, 2), dtype=numpy.float32)
-                    planning_period_duration = self.end_timestamp - self.start_timestamp
+                    # Use cases without a planning period (start = end timestamp) would divide by zero
+                    planning_period_duration = max(self.end_timestamp - self.start_timestamp, 1)
                     i = 0
                     for order_id, order_data in self.order_progress.items():
                         order_timeliness_mat[i,0] = (order_data['deadline'] - self.timestamp) / planning_period_duration
                         order_timeliness_mat[i,1] = (order_data['deadline'] - self.start_timestamp) / planning_period_duration
                         i = i + 1
                     order_timeliness_flat = order_timeliness_mat.flatten()
-                    elements.append(order_timeliness_flat)
+                    block[:] = order_timeliness_flat
 
         # --- Aggregated state variables --- #
 
         for var in self.agg_observation_vector_sizes.keys():
 
-            if self.observation_config[var][1]:
+            if self.observation_dirty.get(var, False):
+                block = self.observation_buffer[self.observation_block_offsets[var][0]:self.observation_block_offsets[var][1]]
+                self.observation_dirty[var] = False
 
                 if var == 'Buffers: average fill level':
                     buf_avg_fill = []
                     for ws_id, ws in self.workstations.items():
                         for buf_idx, buf in list(ws.physical_input_buffers.items()) + list(ws.physical_output_buffers.items()):
                             buf_avg_fill.append(buf.get_average_fill_level())
-                    elements.append(numpy.array(buf_avg_fill))
+                    block[:] = numpy.array(buf_avg_fill)
 
                 if var == 'Buffers: fill level variability':
                     buf_fill_var = []
                     for ws_id, ws in self.workstations.items():
                         for buf_idx, buf in list(ws.physical_input_buffers.items()) + list(ws.physical_output_buffers.items()):
                             buf_fill_var.append(buf.get_fill_level_variability())
-                    elements.append(numpy.array(buf_fill_var))
+                    block[:] = numpy.array(buf_fill_var)
 
                 if var == 'Workstations: productive time ratio':
                     ws_prod_time = []
@@ -5107,7 +5596,7 @@ class ProductionSystem():
                         if elapsed > 0:
                             prod_ratio = ws.busy_time / elapsed if hasattr(ws, "busy_time") else 0.0
                         ws_prod_time.append(prod_ratio)
-                    elements.append(numpy.array(ws_prod_time))
+                    block[:] = numpy.array(ws_prod_time)
 
                 if var == 'Workstations: setup time ratio':
                     ws_setup_time = []
@@ -5117,7 +5606,7 @@ class ProductionSystem():
                         if elapsed > 0:
                             setup_ratio = ws.setup_time / elapsed if hasattr(ws, "setup_time") else 0.0
                         ws_setup_time.append(setup_ratio)
-                    elements.append(numpy.array(ws_setup_time))
+                    block[:] = numpy.array(ws_setup_time)
 
                 if var == 'Workers: productive time ratio':
                     w_busy = []
@@ -5127,7 +5616,7 @@ class ProductionSystem():
                     for worker in self.workers.values():
                         prod_ratio = worker.busy_time / elapsed if hasattr(worker, "busy_time") else 0
                         w_busy.append(prod_ratio)
-                    elements.append(numpy.array(w_busy))
+                    block[:] = numpy.array(w_busy)
 
                 if var == 'Workers: setup time ratio':
                     w_setup = []
@@ -5137,7 +5626,7 @@ class ProductionSystem():
                     for worker in self.workers.values():
                         setup_ratio = worker.setup_time / elapsed if hasattr(worker, "setup_time") else 0
                         w_setup.append(setup_ratio)
-                    elements.append(numpy.array(w_setup))
+                    block[:] = numpy.array(w_setup)
 
                 if var == 'Workers: walking time ratio':
                     w_walk = []
@@ -5147,27 +5636,215 @@ class ProductionSystem():
                     for worker in self.workers.values():
                         walk_ratio = worker.walking_time / elapsed if hasattr(worker, "walking_time") else 0
                         w_walk.append(walk_ratio)
-                    elements.append(numpy.array(w_walk))
+                    block[:] = numpy.array(w_walk)
+
+                if var == 'Workstations: queue summary':
+                    # 1. Queue load n / (n + K), bounded independently of the order volume
+                    # 2. Queued work relative to planning period duration
+                    # 3. Share of queued operations whose order deadline has passed
+                    queue_mat = block.reshape(len(self.workstations), 3)
+                    for i, ws in enumerate(self.workstations.values()):
+                        queued_features = self.get_queued_operation_features(ws)
+                        n_queued = len(queued_features)
+                        queue_mat[i, 0] = n_queued / (n_queued + self.observation_top_k)
+                        queue_mat[i, 1] = sum([f[1] for f in queued_features])
+                        queue_mat[i, 2] = len([f for f in queued_features if f[2] < 0]) / n_queued if n_queued > 0 else 0.0
+
+                if var == 'Orders: summary':
+                    # 1. Elapsed share of the planning period
+                    # 2. Share of released orders
+                    # 3. Share of finished product instances
+                    # 4. Share of released, unfinished orders past their deadline
+                    planning_period_duration = max(self.end_timestamp - self.start_timestamp, 1)
+                    n_orders = max(len(self.order_progress), 1)
+                    n_released = 0
+                    n_late = 0
+                    n_instances = 0
+                    n_finished_instances = 0
+                    for order_data in self.order_progress.values():
+                        finished = [instance['production_end_time'] is not None for instance in order_data['product_progress']]
+                        n_instances += len(finished)
+                        n_finished_instances += sum(finished)
+                        if order_data['release_time'] <= self.timestamp:
+                            n_released += 1
+                            if not all(finished) and order_data['deadline'] < self.timestamp:
+                                n_late += 1
+                    block[0] = (self.timestamp - self.start_timestamp) / planning_period_duration
+                    block[1] = n_released / n_orders
+                    block[2] = n_finished_instances / max(n_instances, 1)
+                    block[3] = n_late / n_orders
+
+
+        # Copy, because the buffer gets overwritten by the next call while callers (e.g. replay buffers) keep observations
+        observation_vector = self.observation_buffer.reshape(1, 1, -1).copy()
+        self.obs_cache = (self.state_version, observation_vector)
+        return observation_vector
+
+    # Observation blocks that depend on the simulation time and not only on the discrete state
+    time_dependent_observations = ['Orders: timeliness',
+                                   'Workstations: top-K queued operations',
+                                   'Workstations: queue summary',
+                                   'Orders: summary',
+                                   'Buffers: average fill level',
+                                   'Buffers: fill level variability',
+                                   'Workstations: productive time ratio',
+                                   'Workstations: setup time ratio',
+                                   'Workers: productive time ratio',
+                                   'Workers: setup time ratio',
+                                   'Workers: walking time ratio']
+
+    # Observation blocks grouped by the part of the state they depend on (see mark_observation_dirty())
+    worker_observations = ['Workers: location (workstation)',
+                           'Workers: location (transport)',
+                           'Workers: destination (workstation)',
+                           'Workers: destination (transport)',
+                           'Workers: status']
+    tool_observations = ['Tools: location', 'Tools: status']
+    workstation_observations = ['Workstations: status']
+    buffer_observations = ['Input buffers: fill level',
+                           'Output buffers: fill level',
+                           'Buffers: average fill level',
+                           'Buffers: fill level variability']
+    operation_observations = ['Operations: location (workstation)',
+                              'Operations: remaining work',
+                              'Workstations: top-K queued operations',
+                              'Workstations: queue summary',
+                              'Orders: summary']
+    # Observation blocks changed by the handler of each event type itself, event types not listed here mark all blocks
+    event_observations = {OrderReleaseEvent: operation_observations,
+                          OperationFinishedEvent: workstation_observations + buffer_observations + operation_observations,
+                          SetupFinishedEvent: workstation_observations + worker_observations,
+                          WorkerStationArrivalEvent: workstation_observations + worker_observations,
+                          MaterialsArrivalEvent: buffer_observations,
+                          RawMaterialArrivalEvent: buffer_observations,
+                          ToolArrivalEvent: tool_observations,
+                          ToolReleaseEvent: tool_observations,
+                          WorkerReleaseEvent: worker_observations,
+                          WorkstationPickupEvent: [],
+                          MaterialsRequest: [],
+                          TransportOrder: [],
+                          LoadingFinishedEvent: buffer_observations,
+                          TransportArrivalEvent: [],
+                          UnloadingFinishedEvent: buffer_observations,
+                          ToolsRequest: tool_observations,
+                          WorkerCapabilitiesRequest: workstation_observations + worker_observations,
+                          WorkerTransportArrivalEvent: worker_observations,
+                          WorkstationSequencingPostponed: [],
+                          PickupRequest: []}
+    # Observation blocks changed by set_cell_action() itself for each required action type
+    action_observations = {ActionType.WORKSTATION_ROUTING: operation_observations,
+                           ActionType.WORKSTATION_SEQUENCING: operation_observations + tool_observations,
+                           ActionType.TRANSPORT_ROUTING: [],
+                           ActionType.TRANSPORT_SEQUENCING: []}
+
+    def get_queued_operation_features(self, workstation : Workstation):
+        '''
+        Returns a list of tuples (deadline, remaining work, time till order deadline, remaining operations of the product instance)
+        for all operations in the input operation buffer of the workstation, sorted by urgency (earliest deadline, then least remaining work).
+        Times are relative to the planning period duration, remaining operations relative to all operations of the product.
+        '''
+        planning_period_duration = max(self.end_timestamp - self.start_timestamp, 1)
+        features = []
+        for op in workstation.input_operation_buffer:
+            order_data = self.order_progress[op[2]]
+            instance = self.instance_progress_index[(op[2], op[1], op[3])]
+            operation_progress = instance['operation_progress']
+            features.append((order_data['deadline'],
+                             operation_progress[op[0]]['remaining_work'] / planning_period_duration,
+                             (order_data['deadline'] - self.timestamp) / planning_period_duration,
+                             instance['remaining_operations'] / len(operation_progress)))
+        features.sort(key=lambda f: (f[0], f[1]))
+        return features
+
+    def prepare_observation_buffer(self):
+        '''
+        Computes the offsets of all enabled observation blocks and preallocates the observation buffer.
+        Only does something if the observation config changed since the last call.
+        '''
+        enabled_vars = [var for var in list(self.raw_observation_vector_sizes.keys()) + list(self.agg_observation_vector_sizes.keys())
+                        if self.observation_config[var][1]]
+        if self.observation_buffer is not None and list(self.observation_block_offsets.keys()) == enabled_vars:
+            return
+        self.observation_block_offsets = dict()
+        offset = 0
+        for var in enabled_vars:
+            size = self.raw_observation_vector_sizes[var] if var in self.raw_observation_vector_sizes.keys() else self.agg_observation_vector_sizes[var]
+            self.observation_block_offsets.update({var: (offset, offset + size)})
+            offset += size
+        self.observation_buffer = numpy.zeros(offset, dtype=numpy.float32)
+        self.observation_dirty = {var: True for var in enabled_vars}
+        # Entity ID -> row/column index of the one-hot observation blocks
+        self.observation_index_maps = {'workstations': {ws_id: i for i, ws_id in enumerate(self.workstations.keys())},
+                                       'transport_machines': {tm_id: i for i, tm_id in enumerate(self.transport_machines.keys())},
+                                       'tools': {tool_id: i for i, tool_id in enumerate(self.tool_state_tracker.keys())}}
+
+    def get_observation_index_array(self, entity_ids : list, index_map_name : str):
+        '''
+        Maps entity IDs (e.g. worker locations) to column indices of a one-hot observation block, -1 for IDs not in the index map.
+        '''
+        index_map = self.observation_index_maps[index_map_name]
+        return numpy.fromiter((index_map.get(entity_id, -1) for entity_id in entity_ids), dtype=numpy.int64, count=len(entity_ids))
+
+    def fill_one_hot_block(self, block, n_rows : int, n_cols : int, col_idx):
+        '''
+        Writes a flattened (n_rows x n_cols) one-hot matrix into the observation block view.
+        Row i gets a 1.0 in column col_idx[i], rows with col_idx[i] = -1 stay all zeros.
+        '''
+        mat = block.reshape(n_rows, n_cols)
+        mat[:] = 0.0
+        rows = numpy.flatnonzero(col_idx >= 0)
+        mat[rows, col_idx[rows]] = 1.0
+
+    def mark_observation_dirty(self, observed_variables=None):
+        '''
+        Called by bump_state_version() whenever the state changes and by kernel methods changing further parts of the state.
+        Marks the given observed variables (all if None) to be recomputed by the next get_obs() call.
+        '''
+        self.obs_cache = None
+        for var in self.observation_dirty.keys():
+            if observed_variables is None or var in observed_variables:
+                self.observation_dirty[var] = True
 
 
-        observation_vector = numpy.concatenate(elements).reshape(1, 1, -1)
-        return observation_vector
 
 
     def is_done(self):
         '''
         Returns a boolean whether the current timestamp of the production system has reached the end timestamp as specified in the GUI.
+        Memoized per state version.
         '''
+        if self.done_cache is not None and self.done_cache[0] == self.state_version:
+            return self.done_cache[1]
+
+        done = None
 
         # Deadlock situation: no actions available
         if len(self.get_legal_actions()) == 0:
             print('XXX Simulation has no more legal actions left (deadlock)!')
-            return True
+            done = True
 
         # Normal case: a game is finished when planning period end is reached
-        if self.timestamp >= self.end_timestamp:
+        elif self.timestamp >= self.end_timestamp:
             print('XXX Simulation has reached the end timestamp.')
-            return True
+            done = True
+
+        self.done_cache = (self.state_version, done)
+        return done
+
+    def set_metrics_sink(self, metrics_sink : MetricsSink):
+        '''
+        Routes the fill level changes of all workstation buffers to the metrics sink (None or a disabled sink turns it off).
+        Buffers keep their fill_level_history for the KPIs either way.
+        '''
+        self.metrics_sink = metrics_sink
+        buffer_sink = metrics_sink if metrics_sink is not None and metrics_sink.enabled else None
+        for ws_id, workstation in self.workstations.items():
+            for idx1, buffer in workstation.physical_input_buffers.items():
+                buffer.metrics_sink = buffer_sink
+                buffer.metrics_id = f'{ws_id} : IN : {idx1}'
+            for idx1, buffer in workstation.physical_output_buffers.items():
+                buffer.metrics_sink = buffer_sink
+                buffer.metrics_id = f'{ws_id} : OUT : {idx1}'
 
         
     def reset(self):
@@ -5177,6 +5854,8 @@ class ProductionSystem():
         print("ProductionSystem: reset()...")
         # Reset time
         self.timestamp = self.start_timestamp
+        self.forced_decision_count = 0
+        self.pending_heuristic_action = None
 
         # Empty the event queue
         #self.event_queue.clear()
@@ -5184,9 +5863,6 @@ class ProductionSystem():
         # Reset order trackers
         self.prepare_order_tracker(reset=True)
 
-        # Major TODO: Implement warm start of the simulation
-        # (i.e. when the system does not start from an empty state)
-
         # Reset worker states
         for worker in self.workers.values():
             worker.location = ''  # workstation / transport machine / worker pool / shopfloor
@@ -5202,6 +5878,7 @@ class ProductionSystem():
         for workstation in self.workstations.values():
             workstation.seized_tools = []
             workstation.input_operation_buffer = []
+            workstation.queued_processing_time = 0.0
             workstation.output_operation_buffer = []
             workstation.wip_operations = []
             workstation.wip_components = []
@@ -5217,12 +5894,291 @@ class ProductionSystem():
         # Reset tool states
         self.prepare_tool_state_tracker()
 
-        # Empty the action_matrix
-        self.action_matrix = numpy.zeros((self.action_matrix_n_rows, self.action_matrix_n_cols), dtype="int32")
+        # Warm start: the system does not start from an empty state but from a saved shop-floor state
+        if self.warm_start_state is not None:
+            self.set_shop_floor_state(self.warm_start_state)
+        elif self.initial_shop_floor_state is not None:
+            # Workstation and transport machine states, their busy times, inventories and pool trackers
+            # are not reset above, restore them as they were before the first episode
+            self.set_shop_floor_state(self.initial_shop_floor_state)
+            self.timestamp = self.start_timestamp
+            for workstation in self.workstations.values():
+                workstation.status_history = []
+                for buffer in list(workstation.physical_input_buffers.values()) + list(workstation.physical_output_buffers.values()):
+                    buffer.fill_level_history = []
+
+        # Legal actions, observation and done flag need to be recomputed
+        self.bump_state_version()
 
         # Following the example from gomoku.py - Gomoku.reset()
         return self.get_obs()
 
+    # Dynamic (simulation tracker) attributes that make up the shop-floor state of each object type
+    shop_floor_state_attributes = {
+        'workstations': ['status', 'remaining_setup_time', 'remaining_maintenance_time', 'remaining_repair_time', 'busy_time', 'setup_time',
+                         'input_operation_buffer', 'output_operation_buffer', 'wip_operations', 'wip_components',
+                         'seized_tools', 'tools_in_use', 'seized_worker'],
+        'workers': ['location', 'destination', 'distance_to_destination', 'status', 'busy_time', 'setup_time', 'walking_time'],
+        'transport_machines': ['status', 'transport_order_list', 'payload', 'current_location', 'departed_from', 'destination',
+                               'remaining_distance', 'seized_worker', 'remaining_handling_time'],
+        'inventories': ['contents']
+    }
+
+    def encode_state_value(self, value):
+        '''
+        Converts a value of the simulation state into a JSON-serializable form.
+        References to model objects are replaced by their IDs, enums and tuples are tagged to be restored exactly.
+        '''
+        if isinstance(value, IntEnum):
+            return {'__enum__': type(value).__name__, 'value': int(value)}
+        if isinstance(value, Workstation):
+            return {'__ref__': 'workstations', 'id': value.workstation_id}
+        if isinstance(value, Inventory):
+            return {'__ref__': 'inventories', 'id': value.inventory_id}
+        if isinstance(value, TransportMachine):
+            return {'__ref__': 'transport_machines', 'id': value.machine_id}
+        if isinstance(value, Worker):
+            return {'__ref__': 'workers', 'id': value.worker_id}
+        if isinstance(value, Tool):
+            return {'__ref__': 'tools', 'id': value.tool_id}
+        if isinstance(value, Order):
+            return {'__ref__': 'orders', 'id': value.order_id}
+        if isinstance(value, Buffer):
+            for ws_id, ws in self.workstations.items():
+                for idx1, buffer in ws.physical_input_buffers.items():
+                    if buffer is value:
+                        return {'__ref__': 'buffers', 'id': f'{ws_id} : IN : {idx1}'}
+                for idx1, buffer in ws.physical_output_buffers.items():
+                    if buffer is value:
+                        return {'__ref__': 'buffers', 'id': f'{ws_id} : OUT : {idx1}'}
+            raise RuntimeError('Buffer does not belong to any workstation of the production system')
+        if isinstance(value, Event):
+            return {'__event__': type(value).__name__, 'attributes': self.encode_state_value(vars(value))}
+        if isinstance(value, tuple):
+            return {'__tuple__': [self.encode_state_value(v) for v in value]}
+        if isinstance(value, list) or isinstance(value, deque):
+            return [self.encode_state_value(v) for v in value]
+        if isinstance(value, dict):
+            if all([isinstance(k, str) for k in value.keys()]):
+                return {k: self.encode_state_value(v) for k, v in value.items()}
+            return {'__items__': [[self.encode_state_value(k), self.encode_state_value(v)] for k, v in value.items()]}
+        return value
+
+    def decode_state_value(self, value):
+        '''
+        Inverse of encode_state_value(), resolves IDs to the model objects of this production system.
+        Events are restored without calling their constructors.
+        '''
+        if isinstance(value, list):
+            return [self.decode_state_value(v) for v in value]
+        if not isinstance(value, dict):
+            return value
+        if '__enum__' in value.keys():
+            return globals()[value['__enum__']](value['value'])
+        if '__ref__' in value.keys():
+            if value['__ref__'] == 'orders':
+                return self.order_list.order_list[value['id']]
+            if value['__ref__'] == 'buffers':
+                ws_id, location, idx1 = value['id'].split(' : ')
+                ws : Workstation = self.workstations[ws_id]
+                buffers = ws.physical_input_buffers if location == 'IN' else ws.physical_output_buffers
+                # Buffer keys are ints when created in the GUI and strings when loaded from JSON
+                return next(buffer for key, buffer in buffers.items() if str(key) == idx1)
+            return getattr(self, value['__ref__'])[value['id']]
+        if '__event__' in value.keys():
+            event_class = globals()[value['__event__']]
+            if not issubclass(event_class, Event):
+                raise RuntimeError(f'{value["__event__"]} is not an Event type')
+            event = event_class.__new__(event_class)
+            event.__dict__.update(self.decode_state_value(value['attributes']))
+            return event
+        if '__tuple__' in value.keys():
+            return tuple([self.decode_state_value(v) for v in value['__tuple__']])
+        if '__items__' in value.keys():
+            return {self.decode_state_value(k): self.decode_state_value(v) for k, v in value['__items__']}
+        return {k: self.decode_state_value(v) for k, v in value.items()}
+
+    def get_shop_floor_state(self, include_order_progress=True):
+        '''
+        Returns the current dynamic state of the production system (WIP, buffer contents, resource states,
+        pending events) as a JSON-serializable dict. Configuration and histories are not included.
+        '''
+        state = {
+            'timestamp': self.timestamp,
+            'worker_pool_tracker': self.encode_state_value(self.worker_pool_tracker),
+            'tool_pool_tracker': self.encode_state_value(self.tool_pool_tracker),
+            'tool_state_tracker': self.encode_state_value(self.tool_state_tracker),
+            'event_queue': self.encode_state_value(self.event_queue),
+            'last_materials_request': self.encode_state_value(self.last_materials_request),
+            'buffers': {}
+        }
+        for object_type, attributes in self.shop_floor_state_attributes.items():
+            state[object_type] = {}
+            for object_id, obj in getattr(self, object_type).items():
+                state[object_type][object_id] = {attribute: self.encode_state_value(getattr(obj, attribute)) for attribute in attributes}
+        for ws_id, ws in self.workstations.items():
+            for idx1, buffer in ws.physical_input_buffers.items():
+                state['buffers'][f'{ws_id} : IN : {idx1}'] = dict(buffer.contents)
+            for idx1, buffer in ws.physical_output_buffers.items():
+                state['buffers'][f'{ws_id} : OUT : {idx1}'] = dict(buffer.contents)
+        if include_order_progress:
+            state['order_progress'] = self.encode_state_value(self.order_progress)
+        return state
+
+    def set_shop_floor_state(self, state : dict):
+        '''
+        Puts the production system into a shop-floor state returned by get_shop_floor_state().
+        The production system has to be simulatable (make_simulatable() called) with the same configuration.
+        Pending decisions are re-derived by run_until_decision_point() from the restored event queue.
+        '''
+        self.timestamp = state['timestamp']
+        if 'order_progress' in state.keys():
+            self.order_progress = self.decode_state_value(state['order_progress'])
+        self.prepare_instance_progress_index()
+        self.worker_pool_tracker = self.decode_state_value(state['worker_pool_tracker'])
+        self.tool_pool_tracker = self.decode_state_value(state['tool_pool_tracker'])
+        self.tool_state_tracker = self.decode_state_value(state['tool_state_tracker'])
+        self.event_queue = deque(self.decode_state_value(state['event_queue']))
+        self.last_materials_request = self.decode_state_value(state['last_materials_request'])
+        for object_type in self.shop_floor_state_attributes.keys():
+            for object_id, object_state in state[object_type].items():
+                obj = getattr(self, object_type)[object_id]
+                for attribute, value in object_state.items():
+                    setattr(obj, attribute, self.decode_state_value(value))
+        for buffer_id, contents in state['buffers'].items():
+            buffer : Buffer = self.decode_state_value({'__ref__': 'buffers', 'id': buffer_id})
+            buffer.contents = dict(contents)
+            buffer.fill_level_history = [(self.timestamp, buffer.get_fill_level())]
+        self.recount_queued_processing_times()
+        self.required_action_type = None
+        self.action_relevant_info = tuple()
+        self.bump_state_version()
+
+    def save_shop_floor_state(self, file_path : str):
+        '''
+        Saves the current shop-floor state into a JSON file to be used as a warm start later.
+        '''
+        with open(file_path, 'w') as json_file:
+            json.dump(self.get_shop_floor_state(), json_file, indent=4)
+
+    def load_warm_start_state(self, file_path : str):
+        '''
+        Loads a shop-floor state saved by save_shop_floor_state() and uses it as the starting state of all following episodes.
+        Call reset() afterwards to apply it.
+        '''
+        with open(file_path, 'r') as json_file:
+            self.warm_start_state = json.load(json_file)
+
+    def checkpoint_to_bytes(self, compress=True):
+        '''
+        Returns the current shop-floor state in the compact binary checkpoint format:
+        header (magic, format version, flags) followed by a (optionally zlib-compressed) body with
+        a JSON part for resources and events, and flat arrays for the per-operation order progress.
+        Only the dynamic state is stored, the static part of order_progress (predecessors, critical path durations)
+        is taken from the production system that loads the checkpoint.
+        '''
+        state = self.get_shop_floor_state(include_order_progress=False)
+
+        # Flatten order progress in its (deterministic) iteration order
+        location_names = []
+        location_idx = {}
+        n_operations = sum([len(instance_data['operation_progress']) for order_data in self.order_progress.values() for instance_data in order_data['product_progress']])
+        n_instances = sum([len(order_data['product_progress']) for order_data in self.order_progress.values()])
+        op_arrays = {name: numpy.empty(n_operations, dtype=dtype) for name, dtype in CHECKPOINT_OPERATION_ARRAYS}
+        instance_arrays = {name: numpy.empty(n_instances, dtype=dtype) for name, dtype in CHECKPOINT_INSTANCE_ARRAYS}
+        o = 0
+        i = 0
+        for order_data in self.order_progress.values():
+            for instance_data in order_data['product_progress']:
+                for operation_data in instance_data['operation_progress'].values():
+                    location = operation_data['location']
+                    if location is None:
+                        op_arrays['location'][o] = -1
+                    else:
+                        if location not in location_idx.keys():
+                            location_idx[location] = len(location_names)
+                            location_names.append(location)
+                        op_arrays['location'][o] = location_idx[location]
+                    op_arrays['status'][o] = operation_data['status']
+                    for name in ['remaining_work', 'start_time', 'finish_time']:
+                        op_arrays[name][o] = numpy.nan if operation_data[name] is None else operation_data[name]
+                    o += 1
+                for name in ['production_end_time', 'productive_time']:
+                    instance_arrays[name][i] = numpy.nan if instance_data[name] is None else instance_data[name]
+                i += 1
+
+        meta = json.dumps({'state': state,
+                           'location_names': location_names,
+                           'n_operations': n_operations,
+                           'n_instances': n_instances}, separators=(',', ':')).encode('utf-8')
+        body = b''.join([struct.pack('<I', len(meta)), meta] +
+                        [op_arrays[name].tobytes() for name, _ in CHECKPOINT_OPERATION_ARRAYS] +
+                        [instance_arrays[name].tobytes() for name, _ in CHECKPOINT_INSTANCE_ARRAYS])
+        flags = 0
+        if compress:
+            body = zlib.compress(body, 1)
+            flags |= CHECKPOINT_FLAG_COMPRESSED
+        return struct.pack('<4sHB', CHECKPOINT_MAGIC, CHECKPOINT_VERSION, flags) + body
+
+    def checkpoint_from_bytes(self, data : bytes):
+        '''
+        Restores a shop-floor state from bytes created by checkpoint_to_bytes().
+        The production system has to be simulatable (make_simulatable() called) with the same configuration.
+        '''
+        header_size = struct.calcsize('<4sHB')
+        magic, version, flags = struct.unpack('<4sHB', data[:header_size])
+        if magic != CHECKPOINT_MAGIC:
+            raise RuntimeError('Not a production system checkpoint')
+        if version != CHECKPOINT_VERSION:
+            raise RuntimeError(f'Unsupported checkpoint format version {version} (expected {CHECKPOINT_VERSION})')
+        body = data[header_size:]
+        if flags & CHECKPOINT_FLAG_COMPRESSED:
+            body = zlib.decompress(body)
+        meta_size = struct.unpack('<I', body[:4])[0]
+        meta = json.loads(body[4:4 + meta_size].decode('utf-8'))
+        offset = 4 + meta_size
+        arrays = {}
+        for array_specs, n in [(CHECKPOINT_OPERATION_ARRAYS, meta['n_operations']), (CHECKPOINT_INSTANCE_ARRAYS, meta['n_instances'])]:
+            for name, dtype in array_specs:
+                arrays[name] = numpy.frombuffer(body, dtype=dtype, count=n, offset=offset).tolist()
+                offset += n * numpy.dtype(dtype).itemsize
+
+        n_operations = sum([len(instance_data['operation_progress']) for order_data in self.order_progress.values() for instance_data in order_data['product_progress']])
+        n_instances = sum([len(order_data['product_progress']) for order_data in self.order_progress.values()])
+        if n_operations != meta['n_operations'] or n_instances != meta['n_instances']:
+            raise RuntimeError('Checkpoint does not match the order list and product operations of this production system')
+
+        location_names = meta['location_names']
+        o = 0
+        i = 0
+        for order_data in self.order_progress.values():
+            for instance_data in order_data['product_progress']:
+                for operation_data in instance_data['operation_progress'].values():
+                    operation_data['location'] = None if arrays['location'][o] < 0 else location_names[arrays['location'][o]]
+                    operation_data['status'] = OperationStatus(arrays['status'][o])
+                    for name in ['remaining_work', 'start_time', 'finish_time']:
+                        operation_data[name] = checkpoint_number(arrays[name][o])
+                    o += 1
+                for name in ['production_end_time', 'productive_time']:
+                    instance_data[name] = checkpoint_number(arrays[name][i])
+                i += 1
+
+        self.set_shop_floor_state(meta['state'])
+
+    def save_checkpoint(self, file_path : str, compress=True):
+        '''
+        Saves the current shop-floor state into a binary checkpoint file (see checkpoint_to_bytes()).
+        '''
+        with open(file_path, 'wb') as checkpoint_file:
+            checkpoint_file.write(self.checkpoint_to_bytes(compress=compress))
+
+    def load_checkpoint(self, file_path : str):
+        '''
+        Resumes from a binary checkpoint file saved by save_checkpoint().
+        '''
+        with open(file_path, 'rb') as checkpoint_file:
+            self.checkpoint_from_bytes(checkpoint_file.read())
+
     def to_dict(self):
         return {
             "worker_capabilities": object_to_dict(self.worker_capabilities),
@@ -5244,3 +6200,152 @@ class ProductionSystem():
             "walking_speed": self.walking_speed,
             "energy_costs": self.energy_costs
         }
+
+    @classmethod
+    def from_dict(cls, data : dict):
+        '''
+        Creates a production system from the use case dictionary written by to_dict(), without any Qt objects.
+        '''
+        workers = {worker_id: Worker(worker_id=worker_data['worker_id'], provided_capabilities=worker_data['provided_capabilities'])
+                   for worker_id, worker_data in data['workers'].items()}
+        tools = {tool_id: Tool(tool_id=tool_data['tool_id'],
+                               dynamic_properties=tool_data['dynamic_properties'],
+                               static_properties=tool_data['static_properties'])
+                 for tool_id, tool_data in data['tools'].items()}
+
+        machines = dict()
+        for machine_data in data['machines'].values():
+            machines.update({machine_data['machine_id']: Machine(machine_id=machine_data['machine_id'],
+                                                                 accepted_capabilities=machine_data['accepted_capabilities'],
+                                                                 provided_capabilities=machine_data['provided_capabilities'],
+                                                                 compatible_tools=machine_data['compatible_tools'],
+                                                                 software_setup_time_value=machine_data['software_setup_time_value'],
+                                                                 software_setup_time_unit=machine_data['software_setup_time_unit'],
+                                                                 software_setup_parallel_to_operation=machine_data['software_setup_parallel_to_operation'],
+                                                                 batch_processing=machine_data['batch_processing'],
+                                                                 batch_size=machine_data['batch_size'],
+                                                                 speed_factor=machine_data['speed_factor'],
+                                                                 mtbf_value=machine_data['mtbf_value'],
+                                                                 mtbf_unit=machine_data['mtbf_unit'],
+                                                                 mttr_value=machine_data['mttr_value'],
+                                                                 mttr_unit=machine_data['mttr_unit'],
+                                                                 is_transport=machine_data['is_transport'],
+                                                                 diff_comp_batch=machine_data['diff_comp_batch'],
+                                                                 power_consumption=machine_data['power_consumption'],
+                                                                 hardware_setup_parallel_to_operation=machine_data['hardware_setup_parallel_to_operation'],
+                                                                 hardware_setup_time_unit=machine_data['hardware_setup_time_unit'],
+                                                                 setup_matrix=machine_data['setup_matrix'],
+                                                                 tool_slots=machine_data['tool_slots'])})
+
+        workstations = dict()
+        for workstation_data in data['workstations'].values():
+            # Buffers are Buffer objects and not just dictionaries
+            physical_buffers = []
+            for buffers_data in [workstation_data['physical_input_buffers'], workstation_data['physical_output_buffers']]:
+                physical_buffers.append({idx: Buffer(buffer_location=buffer_data['buffer_location'],
+                                                     idx1=idx,
+                                                     diff_comp_comb=buffer_data['diff_comp_comb'],
+                                                     sequence_type=buffer_data['sequence_type'],
+                                                     comp_specific_sizes=buffer_data['comp_specific_sizes'],
+                                                     identical_buffer=buffer_data['identical_buffer'])
+                                         for idx, buffer_data in buffers_data.items()})
+            workstations.update({workstation_data['workstation_id']: Workstation(workstation_id=workstation_data['workstation_id'],
+                                                                                 machine=workstation_data['machine'],
+                                                                                 permanent_tools=workstation_data['permanent_tools'],
+                                                                                 seized_tools=list(),
+                                                                                 allowed_tool_pools=workstation_data['allowed_tool_pools'],
+                                                                                 input_operation_buffer=list(),
+                                                                                 output_operation_buffer=list(),
+                                                                                 wip_operations=list(),
+                                                                                 physical_input_buffers=physical_buffers[0],
+                                                                                 physical_output_buffers=physical_buffers[1],
+                                                                                 wip_components=list(),
+                                                                                 allowed_worker_pools=workstation_data['allowed_worker_pools'],
+                                                                                 seized_worker=workstation_data['seized_worker'],
+                                                                                 permanent_worker_assignment=workstation_data['permanent_worker_assignment'],
+                                                                                 tools_in_use=list())})
+
+        orders = {order_id: Order(order_id=order_data['order_id'],
+                                  products=order_data['products'],
+                                  release_time=order_data['release_time'],
+                                  deadline=order_data['deadline'])
+                  for order_id, order_data in data['order_list']['order_list'].items()}
+
+        supply_behaviours = {component_id: SupplyBehaviour(component_id=component_id,
+                                                           allocation_type=SupplyAllocationType(supply_data['allocation_type']),
+                                                           time_unit=supply_data['time_unit'],
+                                                           immediate_probability=supply_data['immediate_probability'],
+                                                           min=supply_data['min'],
+                                                           alpha=supply_data['alpha'],
+                                                           beta=supply_data['beta'])
+                             for component_id, supply_data in data['supply_behaviours'].items()}
+
+        inventories = {inventory_id: Inventory(inventory_id=inventory_id,
+                                               diff_comp_comb=inventory_data['diff_comp_comb'],
+                                               generation_type=InventoryGenerationType(inventory_data['generation_type']),
+                                               sequence_type=BufferSequenceType(inventory_data['sequence_type'] if inventory_data['sequence_type'] is not None else 3),  # FREE as default if unspecified
+                                               comp_specific_sizes=inventory_data['comp_specific_sizes'],
+                                               identical_buffer=inventory_data['identical_buffer'])
+                       for inventory_id, inventory_data in data['inventories'].items()}
+
+        # All containers are passed explicitly, the default arguments of __init__ would be shared between production systems
+        production_system = cls(order_list=OrderList(order_list=orders),
+                                workstations=workstations,
+                                worker_pools={pool_id: list(pool) for pool_id, pool in data['worker_pools'].items()},
+                                tool_pools={pool_id: list(pool) for pool_id, pool in data['tool_pools'].items()},
+                                workers=workers,
+                                machines=machines,
+                                tools=tools,
+                                conveyors=dict(),
+                                inventories=inventories,
+                                supply_behaviours=supply_behaviours,
+                                distance_matrix=data['distance_matrix'],
+                                worker_capabilities=list(data['worker_capabilities']),
+                                machine_capabilities=list(data['machine_capabilities']),
+                                product_instructions=ProductPalette.from_dict(data['product_instructions']),
+                                event_queue=deque())
+        # Use case files of older versions don't contain the simulation and system-wide parameters yet
+        production_system.start_timestamp = data.get('start_timestamp', production_system.start_timestamp)
+        production_system.end_timestamp = data.get('end_timestamp', production_system.end_timestamp)
+        production_system.walking_speed = data.get('walking_speed', production_system.walking_speed)
+        production_system.energy_costs = data.get('energy_costs', production_system.energy_costs)
+        return production_system
+
+    @classmethod
+    def load_from_json(cls, file_path : str):
+        '''
+        Creates a production system from a use case JSON file saved by the GUI.
+        '''
+        with open(file_path, 'r') as json_file:
+            return cls.from_dict(json.load(json_file))
+
+    def apply_optimization_run_config(self, run_config : dict):
+        '''
+        Provides the configuration of an optimization run to the production system (same structure as an entry of the
+        optimization runs table in the GUI: 'algorithm', 'parameters', 'observation_space', 'action_space', 'reward_function').
+        The observation block sizes are taken from the production system, only the enabled flags are read from the config,
+        which may also be given as a list of enabled observation variables. Unlisted variables are disabled.
+        Has to be called after make_simulatable().
+        '''
+        observation_space_config = run_config.get('observation_space', {})
+        if isinstance(observation_space_config, dict):
+            enabled_vars = [var for var, entry in observation_space_config.items() if entry[1]]
+        else:
+            enabled_vars = list(observation_space_config)
+        all_sizes = dict(self.raw_observation_vector_sizes)
+        all_sizes.update(self.agg_observation_vector_sizes)
+        for var in enabled_vars:
+            if var not in all_sizes.keys():
+                raise RuntimeError(f'Unknown observation variable {var} in the optimization run config')
+
+        action_space_config = {decision: tuple(entry) for decision, entry in run_config.get('action_space', {}).items()}
+
+        self.planning_algorithm = run_config['algorithm']
+        self.algorithm_parameters = run_config.get('parameters', {})
+        self.observation_config = {var: (size, var in enabled_vars) for var, size in all_sizes.items()}
+        self.action_config = action_space_config
+        self.action_encoding = action_space_config.get('Action encoding', (False, 'Matrix'))[1].lower()
+        # Sequencing rules registered since the production system was created become selectable actions
+        self.heuristic_actions = self.get_heuristic_actions()
+        self.auto_resolve_forced_decisions = action_space_config.get('Auto-resolve forced decisions', (False, ''))[0]
+        self.reward_config = {kpi: tuple(entry) for kpi, entry in run_config.get('reward_function', {}).items()}
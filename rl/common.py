@@ -1,5 +1,7 @@
 import gymnasium as gym
+from gymnasium.wrappers import TimeLimit
 from .task_envs.task_envs_list import register_environment, get_all_registered_envs
+from .task_envs.production_scheduling_task import PrOPPlanEnv
 
 
 def load_environment(id, production_system, max_episode_steps=10000, register_only=False):
@@ -31,3 +33,21 @@ def load_environment(id, production_system, max_episode_steps=10000, register_on
         env = None
 
     return env
+
+
+def make_vector_env(production_system, num_envs, asynchronous=True, max_episode_steps=10000):
+    """
+    Creates num_envs copies of the PrOPPlan production system environment as one gymnasium vector environment.
+
+    With asynchronous=True every copy runs in its own subprocess (gym.vector.AsyncVectorEnv),
+    otherwise all copies are stepped one after another in this process (gym.vector.SyncVectorEnv).
+    The legal action masks are returned stacked in info['action_mask'].
+    The environments are built directly instead of through the gymnasium registry, whose registration would keep
+    the production system of the first call and would not exist in subprocesses started with spawn or forkserver.
+    """
+    def make_env():
+        return TimeLimit(PrOPPlanEnv(production_system=production_system, copy_production_system=True), max_episode_steps=max_episode_steps)
+    env_fns = [make_env for _ in range(num_envs)]
+    if asynchronous:
+        return gym.vector.AsyncVectorEnv(env_fns)
+    return gym.vector.SyncVectorEnv(env_fns)
@@ -0,0 +1,138 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from .task_envs.production_scheduling_task import PrOPPlanEnv
+
+
+def _shared_memory_worker(index, production_system, pipe, shm_names, layout, autoreset):
+    '''
+    Runs one PrOPPlanEnv in a subprocess and writes its results into row "index" of the shared arrays.
+    Only short commands and acknowledgements travel through the pipe.
+    '''
+    env = PrOPPlanEnv(production_system=production_system)
+    shms = {name: shared_memory.SharedMemory(name=shm_name) for name, shm_name in shm_names.items()}
+    arrays = {name: np.ndarray(layout[name][0], dtype=layout[name][1], buffer=shms[name].buf) for name in layout.keys()}
+
+    def write(obs, info):
+        arrays['observations'][index] = obs.reshape(-1)
+        arrays['action_masks'][index] = info['action_mask']
+
+    try:
+        while True:
+            command, data = pipe.recv()
+            if command == 'reset':
+                obs, info = env.reset(seed=data)
+                write(obs, info)
+                arrays['rewards'][index] = 0.0
+                arrays['terminations'][index] = False
+                pipe.send(None)
+            elif command == 'step':
+                obs, reward, terminated, truncated, info = env.step(data)
+                arrays['rewards'][index] = reward
+                arrays['terminations'][index] = terminated
+                if terminated and autoreset:
+                    obs, info = env.reset()
+                write(obs, info)
+                pipe.send(None)
+            elif command == 'close':
+                pipe.send(None)
+                break
+            else:
+                raise RuntimeError(f'Unknown command {command} sent to shared memory environment worker {index}')
+    finally:
+        for shm in shms.values():
+            shm.close()
+
+
+class SharedMemoryVectorEnv():
+    '''
+    Runs num_envs copies of the production system environment in subprocesses.
+    Observations, rewards, termination flags and legal action masks are written by the workers into preallocated
+    shared-memory arrays, so no observation is pickled through a pipe.
+    The arrays returned by reset() and step() are views of the shared memory: they are overwritten by the next call
+    and have to be copied by the caller if kept (e.g. in a replay buffer).
+    With autoreset=True a terminated environment is reset right away, its row then holds the first observation
+    and action mask of the next episode while rewards and terminations still describe the finished step.
+    '''
+
+    def __init__(self, production_system, num_envs, autoreset=True, context=None):
+        self.num_envs = num_envs
+        self.autoreset = autoreset
+
+        # Dimensions are taken from a local environment, which also prepares the production system
+        # (the workers get copies of the already simulatable production system)
+        probe_env = PrOPPlanEnv(production_system=production_system)
+        self.observation_space = probe_env.observation_space
+        self.action_space = probe_env.action_space
+        observation_dimension = int(np.prod(self.observation_space.shape))
+        action_dimension = int(self.action_space.n)
+
+        layout = {'observations': ((num_envs, observation_dimension), np.float32),
+                  'rewards': ((num_envs,), np.float64),
+                  'terminations': ((num_envs,), np.bool_),
+                  'action_masks': ((num_envs, action_dimension), np.bool_)}
+        self.shms = {}
+        self.arrays = {}
+        for name, (shape, dtype) in layout.items():
+            self.shms[name] = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+            self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=self.shms[name].buf)
+            self.arrays[name].fill(0)
+        self.truncations = np.zeros(num_envs, dtype=np.bool_)  # truncation is left to the training loop
+
+        ctx = multiprocessing.get_context(context)
+        self.pipes = []
+        self.processes = []
+        shm_names = {name: shm.name for name, shm in self.shms.items()}
+        for index in range(num_envs):
+            parent_pipe, child_pipe = ctx.Pipe()
+            process = ctx.Process(target=_shared_memory_worker,
+                                  args=(index, probe_env.production_system, child_pipe, shm_names, layout, autoreset),
+                                  daemon=True)
+            process.start()
+            child_pipe.close()
+            self.pipes.append(parent_pipe)
+            self.processes.append(process)
+        self.closed = False
+
+    def _wait(self):
+        for pipe in self.pipes:
+            pipe.recv()
+
+    def reset(self, seed=None):
+        '''
+        Resets all environments, seed is either None, an int (environment i gets seed + i) or a list of seeds.
+        Returns the observation array and {'action_mask': mask array}, both views of the shared memory.
+        '''
+        if seed is None or isinstance(seed, int):
+            seeds = [None if seed is None else seed + i for i in range(self.num_envs)]
+        else:
+            seeds = list(seed)
+        for pipe, env_seed in zip(self.pipes, seeds):
+            pipe.send(('reset', env_seed))
+        self._wait()
+        return self.arrays['observations'], {'action_mask': self.arrays['action_masks']}
+
+    def step(self, actions):
+        '''
+        Applies one action per environment.
+        Returns observations, rewards, terminations, truncations and {'action_mask': mask array}, all views of the shared memory.
+        '''
+        for pipe, action in zip(self.pipes, actions):
+            pipe.send(('step', int(action)))
+        self._wait()
+        return (self.arrays['observations'], self.arrays['rewards'], self.arrays['terminations'],
+                self.truncations, {'action_mask': self.arrays['action_masks']})
+
+    def close(self):
+        if self.closed:
+            return
+        for pipe in self.pipes:
+            pipe.send(('close', None))
+        self._wait()
+        for process in self.processes:
+            process.join()
+        self.arrays = {}
+        for shm in self.shms.values():
+            shm.close()
+            shm.unlink()
+        self.closed = True
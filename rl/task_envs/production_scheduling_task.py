@@ -1,42 +1,46 @@
 import os
+from copy import deepcopy
 from production_system import ProductionSystem
 import gymnasium as gym
 from gymnasium.utils import seeding
 import numpy as np
 
-class PrOPPlanEnv():  #gym.Env
+class PrOPPlanEnv(gym.Env):
     '''
     Gym Environment of a production scheduling task that defines important functions
-    such as get_obs(), step(), is_done(), compute_reward(), reset() etc.
+    such as get_obs(), step(), is_done(), reset() etc.
+    The legal action mask of the next decision is provided as info['action_mask'] by reset() and step().
     '''
+    metadata = {'render_modes': []}
 
-    def __init__(self, production_system=None, **kwargs):
+    def __init__(self, production_system=None, copy_production_system=False, **kwargs):
 
         print("PrOPPlanEnv: Started initializing...")
 
         # Init Gym Env
-        #super().__init__()
-        #print("PrOPPlanEnv: gym.Env superclass initialized.")
+        super().__init__()
+        print("PrOPPlanEnv: gym.Env superclass initialized.")
 
-        #self.seed()
-        
         # Prepare production system
-        self.production_system : ProductionSystem = production_system
+        # Several environments in one process (e.g. gym.vector.SyncVectorEnv) need their own copy of the production system
+        self.production_system : ProductionSystem = deepcopy(production_system) if copy_production_system else production_system
         self._prepare_production_system()
         print("PrOPPlanEnv: ProductionSystem object prepared.")
 
         # Define observation and action space dimensions here
         observation_dimension = sum([entry[0] for entry in self.production_system.observation_config.values() if entry[1]])
-        action_dimension = self.production_system.action_matrix_n_rows * self.production_system.action_matrix_n_cols
+        action_dimension = self.production_system.get_action_space_size()
         print(f"PrOPPlanEnv: observation_dimension = {observation_dimension}")
         print(f"PrOPPlanEnv: action_dimension = {action_dimension}")
 
-        self.observation_space = gym.spaces.Box(low=0.0, high=1.0, shape=(1,1,observation_dimension), dtype=np.float32)
+        # Some observation blocks (e.g. remaining time till order deadlines) are not normalized to [0, 1]
+        self.observation_space = gym.spaces.Box(low=-np.inf, high=np.inf, shape=(1,1,observation_dimension), dtype=np.float32)
         self.action_space = gym.spaces.Discrete(action_dimension)
 
         # Init logging
+        self.logging = False  # for behavior cloning set self.logging = True
+        self.cumulated_episode_reward = 0.0
 
-        # self.logging = True ############## for behavior cloning set self.logging = False ###############
         # train_sess = 'session_1/'
         # self.env_version = "0.1"
         # self.path_recorded_data = "./selflearningdata/" + train_sess
@@ -55,7 +59,9 @@ class PrOPPlanEnv():  #gym.Env
         return [seed]
     
     def _prepare_production_system(self):
-        self.production_system.make_simulatable()
+        # make_simulatable() is not idempotent, production systems prepared before (e.g. by the GUI) are used as they are
+        if not self.production_system.is_prepared:
+            self.production_system.make_simulatable()
 
     def _production_system_sanity_check(self):
         # TODO Checks whether all functionally necessary attributes have reasonable values, e.g. there are Workers that can provide required capabilities,
@@ -75,26 +81,34 @@ class PrOPPlanEnv():  #gym.Env
         """
         legal_actions = self.production_system.get_legal_actions()
         return legal_actions
+
+    def legal_action_mask(self):
+        """
+        Returns the boolean mask over the flattened action space (True = legal).
+        The mask is cached by the production system and must not be modified.
+        """
+        return self.production_system.get_legal_action_mask()
     
     def step(self, action):
         """
         Function executed each time step.
         Here we get the action execute it in a time step and retrieve the
         observations generated by that action.
+        The production system advances to the next decision point and grants the reward at the end of the episode.
         :param action:
-        :return: obs, reward, done, info
+        :return: obs, reward, terminated, truncated, info
         """
         print("PrOPPlanEnv: Starting a step...")
-        self._set_action(action)
-        obs = self._get_obs()
-        done = self._is_done(obs)
-        info = {}
-        reward = self._compute_reward(obs, done)
+        obs, reward, done, kernel_info = self.production_system.step(int(action))
+        info = self._get_info()
+        if kernel_info is not None:
+            info.update(kernel_info)
         self.cumulated_episode_reward += reward
         print("PrOPPlanEnv: Step finished")
         if self.logging:
             self._log_step(obs, action, reward, done)
-        return obs, reward, done, info
+        # Truncation after max_episode_steps is handled by the TimeLimit wrapper of gym.make()
+        return obs, reward, done, False, info
 
     def _log_step(self, obs, action, reward, done):
         """
@@ -109,24 +123,37 @@ class PrOPPlanEnv():  #gym.Env
         Reset the game for a new game.
 
         Returns:
-            Initial observation of the game.
+            Initial observation of the game and info with the action mask of the first decision.
         """
         print("PrOPPlanEnv: Resetting...")
+        super().reset(seed=seed)
+        if seed is not None:
+            # The simulation draws random numbers (e.g. 'Random' heuristics) from numpy's global generator
+            np.random.seed(seed)
         self.production_system.reset()
+        self._init_env_variables()
+        # In the beginning of each episode only the dummy action -1 is legal, progress to the first actual decision point
+        while self.production_system.get_legal_actions() == [-1] and not self.production_system.is_done():
+            self.production_system.set_action(-1)
         obs = self._get_obs()
         print("PrOPPlanEnv: Finished resetting")
-        return obs
+        return obs, self._get_info()
     
     def _get_obs(self):
         """Returns the observation.
         """
         return self.production_system.get_obs()
 
+    def _get_info(self):
+        """Returns the info dict with a copy of the legal action mask of the next decision.
+        """
+        return {'action_mask': self.production_system.get_legal_action_mask().copy()}
+
     def _init_env_variables(self):
         """Inits variables needed to be initialised each time we reset at the start
         of an episode.
         """
-        raise NotImplementedError()
+        self.cumulated_episode_reward = 0.0
 
     def _set_action(self, action):
         """Applies the given action to the simulation.
@@ -139,11 +166,6 @@ class PrOPPlanEnv():  #gym.Env
         done = self.production_system.is_done()
         return done
 
-    def _compute_reward(self, observations, done):
-        """Calculates the reward to give based on the observations given.
-        """
-        raise NotImplementedError()
-
     def _env_setup(self, initial_qpos):
         """Initial configuration of the environment. Can be used to configure initial state
         and extract information from the simulation.
@@ -153,5 +175,3 @@ class PrOPPlanEnv():  #gym.Env
     def _set_init_approach_pose(self):
         # TODO Adjust from SmartAssembly to PrOPPlan (theory: instead of bringing the robot back to initial pose, prepare Propplan GUI?)
         raise NotImplementedError()
-
-
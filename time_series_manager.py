@@ -1,32 +1,329 @@
-import influxdb_client
-from influxdb_client import InfluxDBClient, Point
-from influxdb_client.client.write_api import SYNCHRONOUS
+import math
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timezone
 
-class TimeSeriesManager:
+# Metrics sinks receive time series data of the simulation (currently buffer fill levels) for external analysis.
+# Database clients are only imported when a sink that needs them is created, so that importing
+# the production system stays cheap and works without them.
+METRICS_SINKS = {}  # name: MetricsSink subclass
+
+
+def metrics_sink(name : str):
+    '''Registers a MetricsSink subclass under the given name (see create_metrics_sink()).'''
+    def register(sink_class):
+        METRICS_SINKS[name] = sink_class
+        return sink_class
+    return register
+
+
+def create_metrics_sink(name : str, **kwargs):
+    '''Creates the metrics sink registered under name, keyword arguments are passed to its constructor.'''
+    if name not in METRICS_SINKS.keys():
+        raise RuntimeError(f'Unknown metrics sink {name}, registered sinks: {", ".join(METRICS_SINKS.keys())}')
+    return METRICS_SINKS[name](**kwargs)
+
+
+def escape_line_protocol_tag(value : str):
+    '''Escapes commas, equal signs and spaces in tag keys and values of the InfluxDB line protocol.'''
+    return str(value).replace(',', '\\,').replace('=', '\\=').replace(' ', '\\ ')
+
+
+def unescape_line_protocol_tag(value : str):
+    return re.sub(r'\\([,= ])', r'\1', value)
+
+
+def buffer_state_line(buffer_id, fill_level, timestamp):
+    '''Returns a buffer fill level point in InfluxDB line protocol with a timestamp in seconds.'''
+    return f'buffer_metrics,buffer_id={escape_line_protocol_tag(buffer_id)} fill_level={float(fill_level)} {int(timestamp)}'
+
+
+def parse_buffer_state_line(line : str):
+    '''Returns (buffer_id, fill_level, timestamp) of a line written by buffer_state_line() or None for other lines.'''
+    parts = re.split(r'(?<!\\) ', line.strip())
+    if len(parts) != 3 or not parts[0].startswith('buffer_metrics,buffer_id=') or not parts[1].startswith('fill_level='):
+        return None
+    return (unescape_line_protocol_tag(parts[0][len('buffer_metrics,buffer_id='):]),
+            float(parts[1][len('fill_level='):]),
+            int(parts[2]))
+
+
+def time_weighted_fill_level_stats(points):
+    '''
+    Returns (average, variability) of a list of (timestamp, fill_level) tuples sorted by time.
+    Each fill level is weighted with the time until the next point, like Buffer.get_average_fill_level()
+    and Buffer.get_fill_level_variability() (standard deviation).
+    '''
+    weighted_sum = 0.0
+    weighted_square_sum = 0.0
+    total_duration = 0.0
+    for i in range(len(points) - 1):
+        duration = points[i+1][0] - points[i][0]
+        weighted_sum += duration * points[i][1]
+        weighted_square_sum += duration * points[i][1] ** 2
+        total_duration += duration
+    if total_duration <= 0:
+        return 0.0, 0.0
+    avg = weighted_sum / total_duration
+    return avg, math.sqrt(max(weighted_square_sum / total_duration - avg ** 2, 0.0))
+
+
+class MetricsSink():
+    '''
+    Base class of metrics sinks. Buffers only call a sink whose enabled flag is True.
+    Sinks have to stay picklable (production systems are copied into worker processes),
+    connections, open files and threads are therefore created on first use and dropped when pickled.
+    '''
+    enabled = True
+
+    def log_buffer_state(self, buffer_id, fill_level, timestamp):
+        raise NotImplementedError()
+
+    def get_buffer_stats(self, buffer_id, start_time, end_time=None):
+        '''Returns the time-weighted (average, variability) of a buffer's fill level between start_time and end_time (timestamps in seconds).'''
+        raise NotImplementedError()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+@metrics_sink('None')
+class NullMetricsSink(MetricsSink):
+    '''Discards everything, buffers skip the call altogether.'''
+    enabled = False
+
+    def log_buffer_state(self, buffer_id, fill_level, timestamp):
+        pass
+
+
+@metrics_sink('In-memory')
+class InMemoryMetricsSink(MetricsSink):
+    '''Keeps all points in a list of tuples (buffer_id, fill_level, timestamp).'''
     def __init__(self):
-        self.client = InfluxDBClient(
-            url="http://localhost:8086",
-            token="JZm7xcbBi7_Lbyg4cBWdnlCuOSFblf727-m2jHZ0kPoS3bTSXsjwL3VGol1kFf2NeVj2QhpQMOVEElCPBpEI7A==",
-            org="RIF"
-        )
+        self.points = []
+
+    def log_buffer_state(self, buffer_id, fill_level, timestamp):
+        self.points.append((buffer_id, fill_level, timestamp))
+
+    def get_buffer_stats(self, buffer_id, start_time, end_time=None):
+        points = sorted([(t, fill_level) for b_id, fill_level, t in self.points
+                         if b_id == buffer_id and t >= start_time and (end_time is None or t <= end_time)], key=lambda point: point[0])
+        return time_weighted_fill_level_stats(points)
+
+
+class LineProtocolFileBackend():
+    '''Appends batches of line protocol to a local file, a stand-in for the database when testing.'''
+    def __init__(self, file_path='buffer_metrics.lp'):
+        self.file_path = file_path
+        self.file = None
+
+    def write_lines(self, lines):
+        if self.file is None:
+            self.file = open(self.file_path, 'a')
+        self.file.write('\n'.join(lines) + '\n')
+        self.file.flush()
+
+    def query_buffer_points(self, buffer_id, start_time, end_time=None):
+        '''Returns the (timestamp, fill_level) points of a buffer in the time range sorted by time.'''
+        if not os.path.exists(self.file_path):
+            return []
+        points = []
+        with open(self.file_path, 'r') as file:
+            for line in file:
+                point = parse_buffer_state_line(line)
+                if point is not None and point[0] == buffer_id and point[2] >= start_time and (end_time is None or point[2] <= end_time):
+                    points.append((point[2], point[1]))
+        return sorted(points, key=lambda point: point[0])
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['file'] = None
+        return state
+
+
+class InfluxDBBackend():
+    '''
+    Writes batches of line protocol into an InfluxDB bucket. The connection parameters default to the environment variables
+    INFLUXDB_URL, INFLUXDB_TOKEN and INFLUXDB_ORG, influxdb_client is only imported on first use.
+    '''
+    def __init__(self, url=None, token=None, org=None, bucket='simulation'):
+        self.url = url if url is not None else os.environ.get('INFLUXDB_URL', 'http://localhost:8086')
+        self.token = token if token is not None else os.environ.get('INFLUXDB_TOKEN', '')
+        self.org = org if org is not None else os.environ.get('INFLUXDB_ORG', 'RIF')
+        self.bucket = bucket
+        self.client = None
+        self.write_api = None
+        self.query_api = None
+
+    def connect(self):
+        if self.client is not None:
+            return
+        from influxdb_client import InfluxDBClient
+        from influxdb_client.client.write_api import SYNCHRONOUS
+        self.client = InfluxDBClient(url=self.url, token=self.token, org=self.org)
+        # Batching is done by BatchedMetricsWriter, each batch is one synchronous request
         self.write_api = self.client.write_api(write_options=SYNCHRONOUS)
         self.query_api = self.client.query_api()
 
-    def log_buffer_state(self, buffer_id, fill_level, timestamp):
-        point = Point("buffer_metrics") \
-            .tag("buffer_id", buffer_id) \
-            .field("fill_level", fill_level) \
-            .time(timestamp)
-        self.write_api.write(bucket="simulation", record=point)
+    def write_lines(self, lines):
+        self.connect()
+        from influxdb_client import WritePrecision
+        self.write_api.write(bucket=self.bucket, record=lines, write_precision=WritePrecision.S)
 
-    def get_buffer_stats(self, buffer_id, start_time):
+    def query_buffer_points(self, buffer_id, start_time, end_time=None):
+        '''Returns the (timestamp, fill_level) points of a buffer in the time range sorted by time.'''
+        self.connect()
+        def rfc3339(timestamp):
+            return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        # The stop of range() is exclusive
+        stop = f', stop: {rfc3339(end_time + 1)}' if end_time is not None else ''
+        escaped_buffer_id = buffer_id.replace('\\', '\\\\').replace('"', '\\"')
         query = f'''
-        from(bucket:"simulation")
-            |> range(start: {start_time})
+        from(bucket:"{self.bucket}")
+            |> range(start: {rfc3339(start_time)}{stop})
             |> filter(fn: (r) => r["_measurement"] == "buffer_metrics")
-            |> filter(fn: (r) => r["buffer_id"] == "{buffer_id}")
-            |> aggregateWindow(every: 1s, fn: mean)
+            |> filter(fn: (r) => r["buffer_id"] == "{escaped_buffer_id}")
+            |> filter(fn: (r) => r["_field"] == "fill_level")
+            |> sort(columns: ["_time"])
         '''
-        result = self.query_api.query(query)
-        # Process results
-        return avg, variability
\ No newline at end of file
+        points = []
+        for table in self.query_api.query(query):
+            for record in table.records:
+                points.append((int(record.get_time().timestamp()), float(record.get_value())))
+        return sorted(points, key=lambda point: point[0])
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+            self.write_api = None
+            self.query_api = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update({'client': None, 'write_api': None, 'query_api': None})
+        return state
+
+
+class BatchedMetricsWriter(MetricsSink):
+    '''
+    Collects points in a bounded queue and writes them to the backend in batches from a background thread.
+    A batch is written once batch_size points are collected or flush_interval seconds after its first point.
+    At most max_queued_points points wait in the queue, log_buffer_state() blocks while it is full (back-pressure),
+    so a slow backend slows the simulation down instead of filling up the memory.
+    Errors of the backend are raised as RuntimeError by the next log_buffer_state(), flush() or close().
+    '''
+    _FLUSH = object()
+    _STOP = object()
+
+    def __init__(self, backend, batch_size=5000, flush_interval=1.0, max_queued_points=100000):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queued_points = max_queued_points
+        self.queue = None
+        self.thread = None
+        self.error = None
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.queue = queue.Queue(maxsize=self.max_queued_points)
+        self.thread = threading.Thread(target=self._write_batches, name='BatchedMetricsWriter', daemon=True)
+        self.thread.start()
+
+    def _write_batches(self):
+        batch = []
+        batch_deadline = None
+        while True:
+            try:
+                # An empty batch waits for the next point, otherwise until the batch is due
+                item = self.queue.get(timeout=None if not batch else max(batch_deadline - time.monotonic(), 0.0))
+            except queue.Empty:
+                item = None  # The batch is due
+            if item is not None and item is not self._FLUSH and item is not self._STOP:
+                if not batch:
+                    batch_deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+                # A steady stream of points never lets get() time out, the deadline is checked here as well
+                if len(batch) < self.batch_size and time.monotonic() < batch_deadline:
+                    continue
+            if batch:
+                try:
+                    self.backend.write_lines(batch)
+                except Exception as e:
+                    # The batch is dropped, the error is raised in the simulation thread
+                    self.error = e
+                for _ in range(len(batch)):
+                    self.queue.task_done()
+                batch = []
+            if item is self._FLUSH or item is self._STOP:
+                self.queue.task_done()
+            if item is self._STOP:
+                break
+
+    def _raise_error(self):
+        if self.error is not None:
+            error = self.error
+            self.error = None
+            raise RuntimeError(f'Writing metrics to {type(self.backend).__name__} failed: {error}') from error
+
+    def log_buffer_state(self, buffer_id, fill_level, timestamp):
+        self._raise_error()
+        self.start()
+        self.queue.put(buffer_state_line(buffer_id, fill_level, timestamp))
+
+    def flush(self):
+        '''Blocks until all points logged so far are written.'''
+        if self.thread is not None:
+            self.queue.put(self._FLUSH)
+            self.queue.join()
+        self._raise_error()
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(self._STOP)
+            self.thread.join()
+            self.thread = None
+            self.queue = None
+        self.backend.close()
+        self._raise_error()
+
+    def get_buffer_stats(self, buffer_id, start_time, end_time=None):
+        self.flush()
+        return time_weighted_fill_level_stats(self.backend.query_buffer_points(buffer_id, start_time, end_time))
+
+    def __getstate__(self):
+        # Points still waiting in the queue stay with the original writer
+        state = self.__dict__.copy()
+        state.update({'queue': None, 'thread': None, 'error': None})
+        return state
+
+
+@metrics_sink('File')
+class FileMetricsSink(BatchedMetricsWriter):
+    '''Writes points in InfluxDB line protocol (timestamps in seconds) to a local file in batches.'''
+    def __init__(self, file_path='buffer_metrics.lp', **kwargs):
+        super().__init__(LineProtocolFileBackend(file_path), **kwargs)
+
+
+@metrics_sink('InfluxDB')
+class InfluxDBMetricsSink(BatchedMetricsWriter):
+    '''Writes points into an InfluxDB bucket in batches (see InfluxDBBackend for the connection parameters).'''
+    def __init__(self, url=None, token=None, org=None, bucket='simulation', **kwargs):
+        super().__init__(InfluxDBBackend(url=url, token=token, org=org, bucket=bucket), **kwargs)
+
+
+# Former name of the InfluxDB sink
+TimeSeriesManager = InfluxDBMetricsSink
@@ -25,6 +25,7 @@ from order_list import OrderList, Order
 from production_system import *
 from simulation import ProductionSystemSimulation
 from plan_visualizer import SchedulePlotter, TimeSeriesPlotter
+from heuristic_evaluation import evaluate_run_config, write_kpi_table
 from muzero.muzero import MuZero, CPUActor
 from file_utils import object_to_dict
 
@@ -3505,6 +3506,18 @@ class ProductionResourcesTab(QWidget):
                 self.machines_list_widget.addItems(list(ps.machines.keys()))
             if ps.workstations:
                 self.workstation_list_widget.addItems(list(ps.workstations.keys()))
+            # Context menus of the lists (connected by the add_new_...() functions for manually added entries)
+            for list_widget, show_menu in [(self.worker_cap_list_widget, self.show_capability_menu),
+                                           (self.workers_list_widget, self.show_worker_menu),
+                                           (self.worker_pool_list_widget, self.show_pool_menu),
+                                           (self.tool_list_widget, self.show_tool_menu),
+                                           (self.toolpools_list_widget, self.show_toolpools_menu),
+                                           (self.machine_cap_list_widget, self.show_machine_capability_menu),
+                                           (self.machines_list_widget, self.show_machine_menu),
+                                           (self.workstation_list_widget, self.show_workstation_menu)]:
+                if list_widget.count() > 0:
+                    list_widget.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
+                    list_widget.customContextMenuRequested.connect(show_menu)
 
 
 class ProbabilityDistributionWidget(QWidget):
@@ -4926,8 +4939,11 @@ class ManualPlanningDialog(QDialog):
         '''
         Decodes provided integer action code into a human-readable form.
         '''
-        j = action % production_system.action_matrix_n_cols
-        i = int((action - j) / production_system.action_matrix_n_cols)
+        if action == -1:
+            return ''
+        if production_system.action_encoding == 'heuristic':
+            return production_system.heuristic_actions[action][1]
+        i, j = production_system.decode_action(action)
         explanation = ''
         if production_system.required_action_type == ActionType.WORKSTATION_SEQUENCING:
             # workstation --> operation triple or 'skip'
@@ -4943,6 +4959,27 @@ class ManualPlanningDialog(QDialog):
             explanation = production_system.action_matrix_reverse_row_dict[i] + ' --> ' + production_system.action_matrix_reverse_col_dict[j]
         return explanation
 
+class HeuristicEvaluationThread(QtCore.QThread):
+    '''Runs the evaluation of an "Only heuristics" optimization run (see heuristic_evaluation.py) without blocking the GUI.'''
+    evaluated_signal = QtCore.pyqtSignal(object, object, object)  # Signal emitted with run_id, rows and summary when done
+    failed_signal = QtCore.pyqtSignal(object, object)  # Signal emitted with run_id and the exception
+
+    def __init__(self, run_id, use_case_data, run_config, parent=None):
+        super().__init__(parent)
+        self.run_id = run_id
+        self.use_case_data = use_case_data
+        self.run_config = run_config
+
+    def run(self):
+        try:
+            # Forking the multi-threaded GUI process could copy locks held by other threads, the workers are spawned instead
+            rows, summary = evaluate_run_config(self.use_case_data, self.run_config, context='spawn')
+        except Exception as e:
+            self.failed_signal.emit(self.run_id, e)
+            return
+        self.evaluated_signal.emit(self.run_id, rows, summary)
+
+
 class AIOptimizationTab(QWidget):
     def __init__(self):
         super().__init__()
@@ -4950,6 +4987,9 @@ class AIOptimizationTab(QWidget):
         # Datastructure to store optimization runs
         self.optimization_runs = {}
 
+        # Running "Only heuristics" evaluations, run_id: HeuristicEvaluationThread
+        self.heuristic_evaluation_threads = {}
+
         self.init_ui()
 
     def init_ui(self):
@@ -5092,6 +5132,25 @@ class AIOptimizationTab(QWidget):
                                                             'discount_factor': muzero_df,
                                                             'network_architecture': muzero_na}))
         param_stack.addWidget(muzero_widget)
+
+        # Only heuristics parameters
+        heuristics_widget = QWidget()
+        heuristics_layout = QFormLayout()
+        heuristics_seeds = QLineEdit()
+        heuristics_processes = QLineEdit()
+        if run_id in self.optimization_runs and 'parameters' in self.optimization_runs[run_id] and self.optimization_runs[run_id]['algorithm'] == "Only heuristics":
+            saved = self.optimization_runs[run_id]['parameters']
+            heuristics_seeds.setText(saved.get('number_of_seeds', "10"))
+            heuristics_processes.setText(saved.get('worker_processes', ""))
+        else:
+            heuristics_seeds.setText("10")
+            heuristics_processes.setText("")
+        heuristics_layout.addRow("Number of seeds:", heuristics_seeds)
+        heuristics_layout.addRow("Worker processes:", heuristics_processes)
+        heuristics_widget.setLayout(heuristics_layout)
+        param_widgets.append(('Only heuristics', heuristics_widget, {'number_of_seeds': heuristics_seeds,
+                                                                     'worker_processes': heuristics_processes}))
+        param_stack.addWidget(heuristics_widget)
         
         # RL-DQN parameters
         dqn_widget = QWidget()
@@ -5252,6 +5311,10 @@ class AIOptimizationTab(QWidget):
                     indirect_combo.setCurrentIndex(0)
             else:
                 indirect_combo.setCurrentIndex(0)
+        if 'Action encoding' in stored_specs:
+            action_page.encoding_combo.setCurrentIndex(max(0, action_page.encoding_combo.findText(stored_specs['Action encoding'][1])))
+        if 'Auto-resolve forced decisions' in stored_specs:
+            action_page.auto_resolve_checkbox.setChecked(stored_specs['Auto-resolve forced decisions'][0])
 
         # Set up dialog layout with the page and OK/Cancel buttons
         layout = QVBoxLayout(dialog)
@@ -5270,6 +5333,8 @@ class AIOptimizationTab(QWidget):
                 indirect_combo = action_page.table.cellWidget(i, 2)
                 indirect_value = indirect_combo.currentText()
                 new_action[decision_type] = (direct_selected, indirect_value)
+            new_action['Action encoding'] = (False, action_page.encoding_combo.currentText())
+            new_action['Auto-resolve forced decisions'] = (action_page.auto_resolve_checkbox.isChecked(), '')
             self.optimization_runs[run_id]['action_space'] = new_action
 
     def show_reward_function_config(self, row):
@@ -5459,17 +5524,10 @@ class AIOptimizationTab(QWidget):
         
         # Get optimization run configuration
         algorithm = self.optimization_runs[run_id]['algorithm']
-        algo_parameters = self.optimization_runs[run_id]['parameters']
-        observation_space_config = self.optimization_runs[run_id]['observation_space']
-        action_space_config = self.optimization_runs[run_id]['action_space']
-        reward_function_config = self.optimization_runs[run_id]['reward_function']
-
-        # Provide optimization run configuration to the production system object
-        production_system.planning_algorithm = algorithm
-        production_system.algorithm_parameters = algo_parameters
-        production_system.observation_config = observation_space_config
-        production_system.action_config = action_space_config
-        production_system.reward_config = reward_function_config
+
+        # Provide optimization run configuration to the production system object (shared with headless_runner.py)
+        production_system.apply_optimization_run_config(self.optimization_runs[run_id])
+        observation_space_config = production_system.observation_config
 
         if algorithm == 'Manual planning':
             # Open up a new dialog with human-readable observation and action interface
@@ -5482,12 +5540,11 @@ class AIOptimizationTab(QWidget):
 
         # Calculate action shape (flattened)
 
-        # TODO: Selecting heuristics as actions will require a different action matrix form
-        # (additional columns and rows...).
+        # With the 'Heuristic' encoding the agent selects dispatching rules instead of action matrix cells.
         # Also, if both sequencing and routing at workstations are done using fixed heuristics,
         # big parts of the action matrix become unnecessary.
 
-        action_dimension = production_system.action_matrix_n_rows * production_system.action_matrix_n_cols
+        action_dimension = production_system.get_action_space_size()
 
         if algorithm == 'RL-MuZero':
             # Prepare MuZeroConfig to override the default config
@@ -5505,7 +5562,29 @@ class AIOptimizationTab(QWidget):
             muzero.train()
 
         if algorithm == 'Only heuristics':
-            raise NotImplementedError()
+            # Every combination of heuristics is simulated with several seeds in a process pool,
+            # the workers build their own production system from the use case data
+            if run_id in self.heuristic_evaluation_threads:
+                QMessageBox.information(self, 'Optimization run', f'Run {run_id} is still being evaluated.')
+                return
+            thread = HeuristicEvaluationThread(run_id, production_system.to_dict(), self.optimization_runs[run_id], parent=self)
+            thread.evaluated_signal.connect(self.heuristic_evaluation_finished)
+            thread.failed_signal.connect(self.heuristic_evaluation_failed)
+            self.heuristic_evaluation_threads[run_id] = thread
+            thread.start()
+
+    def heuristic_evaluation_finished(self, run_id, rows, summary):
+        '''Stores the KPI table of a finished "Only heuristics" run (called in the GUI thread).'''
+        self.heuristic_evaluation_threads.pop(run_id).wait()
+        write_kpi_table(summary, f'kpi_table_{run_id}.csv')
+        print(f'KPI table of run {run_id} written to kpi_table_{run_id}.csv, best combination:')
+        print(summary[0])
+        self.optimization_runs[run_id]['result_reward'] = summary[0]['Reward']
+        self.optimization_runs[run_id]['result_details'] = summary
+
+    def heuristic_evaluation_failed(self, run_id, error):
+        self.heuristic_evaluation_threads.pop(run_id).wait()
+        QMessageBox.critical(self, 'Optimization run', f'Evaluation of run {run_id} failed: {error}')
 
 
 class OptimizationWizard(QWizard):
@@ -5573,6 +5652,8 @@ class OptimizationWizard(QWizard):
             indirect_value = indirect_combo.currentText()
             # Populate the dictionary: key is decision type; value is tuple (direct boolean, indirect string)
             action_dict[decision_type] = (direct_selected, indirect_value)
+        action_dict['Action encoding'] = (False, action_page.encoding_combo.currentText())
+        action_dict['Auto-resolve forced decisions'] = (action_page.auto_resolve_checkbox.isChecked(), '')
 
         # RewardFunctionConfigPage is the 4th page
         reward_page = self.page(3)
@@ -5683,9 +5764,11 @@ class AlgorithmConfigPage(QWizardPage):
         muzero_widget.setLayout(muzero_layout)
         self.param_stack.addWidget(muzero_widget)
 
-        # Heuristics
+        # Heuristics (all combinations of heuristics are evaluated, see heuristic_evaluation.py)
         heuristic_widget = QWidget()
         heuristic_layout = QFormLayout()
+        heuristic_layout.addRow("Number of seeds:", QLineEdit("10"))
+        heuristic_layout.addRow("Worker processes:", QLineEdit(""))  # empty: all cores
         heuristic_widget.setLayout(heuristic_layout)
         self.param_stack.addWidget(heuristic_widget)
 
@@ -5840,12 +5923,7 @@ class ActionSpaceConfigPage(QWizardPage):
             "Transport routing",
             "Transport sequencing"
         ]
-        indirect_options = {
-            "Workstation routing": ["", "Least queued operations (LQO)", "Least queued and processed operations (LQPO)", "Least queued time (LQT)", "Random"],
-            "Workstation sequencing": ["", "FIFO", "Longest processing time (LPT)", "Shortest processing time (SPT)", "Earliest deadline first (EDF)", "Least operations remaining (LOR)", "Most operations remaining (MOR)", "Random"],
-            "Transport routing": ["", "Closest transport (CT)", "Least queued transport orders (LQTO)", "Random"],
-            "Transport sequencing": ["", "Closest destination (CD)", "FIFO", "Random"]
-        }
+        indirect_options = {decision: [""] + heuristics for decision, heuristics in ProductionSystem.get_heuristic_options().items()}
 
         # Populate the table rows
         for row, decision in enumerate(decision_types):
@@ -5884,9 +5962,22 @@ class ActionSpaceConfigPage(QWizardPage):
 
         self.table.resizeColumnsToContents()
 
+        # Encoding of direct actions as integers: full action matrix or only its statically feasible cells
+        self.encoding_combo = QComboBox()
+        self.encoding_combo.addItems(["Matrix", "Compact", "Heuristic"])
+        self.encoding_combo.setToolTip("Compact: only (operation, workstation) and (transport, location) pairs that can ever be legal are enumerated\n"
+                                       "Heuristic: for decision types marked as direct, the agent selects which dispatching rule decides")
+
         # Add the table to the page layout
         layout = QVBoxLayout()
         layout.addWidget(self.table)
+        encoding_layout = QFormLayout()
+        encoding_layout.addRow("Action encoding:", self.encoding_combo)
+        # Decisions with a single real option don't need to be handed to the planning algorithm
+        self.auto_resolve_checkbox = QCheckBox()
+        self.auto_resolve_checkbox.setToolTip("Apply decisions with only one option inside the simulation instead of asking the planning algorithm")
+        encoding_layout.addRow("Auto-resolve forced decisions:", self.auto_resolve_checkbox)
+        layout.addLayout(encoding_layout)
         self.setLayout(layout)
 
 
@@ -5903,13 +5994,7 @@ class RewardFunctionConfigPage(QWizardPage):
         #self.table.horizontalHeader().setStretchLastSection(True)
         
         # Fixed KPI texts for each row
-        kpi_texts = [
-            "Mean order lead time",
-            "Mean absolute order deadline deviation",
-            "Mean productive time ratio of workstations",
-            "Mean productive time ratio of workers",
-            "Mean buffer fill variability factor"
-        ]
+        kpi_texts = ProductionSystem.reward_kpis
         
         # Populate the table rows
         for row in range(5):
@@ -6117,217 +6202,84 @@ class MainWindow(QMainWindow):
 
     def load_production_system_from_json(self, path):
         """Reads production system data stored in a JSON file on the provided path"""
-        # Transform data from use case file into a production system object and populate widgets
-        with open(path, "r") as json_file:
-            loaded_data = json.load(json_file)
-            print(loaded_data)
-
-        # Populate Production Resources tab, write data to production_system object
-        for x in loaded_data['worker_capabilities']:
-            self.production_resources_tab.add_new_worker_capability(provided_str=x)
-        for k,v in loaded_data['workers'].items():
-            self.production_resources_tab.add_new_worker(provided_dict=v)
-        for k,v in loaded_data['worker_pools'].items():
-            self.production_resources_tab.add_new_pool(pool_id=k, provided_list=v)
-        for k,v in loaded_data['tools'].items():
-            self.production_resources_tab.add_new_tool(provided_dict=v)
-        for k,v in loaded_data['tool_pools'].items():
-            self.production_resources_tab.add_new_toolpool(pool_id=k, provided_list=v)
-        for x in loaded_data['machine_capabilities']:
-            self.production_resources_tab.add_new_machine_capability(provided_str=x)
-        for k,v in loaded_data['machines'].items():
-            self.production_resources_tab.add_new_machine(provided_dict=v)
-        for k,v in loaded_data['workstations'].items():
-            self.production_resources_tab.add_new_workstation(provided_dict=v)
-
-        # Load product instructions
-        product_palette_data = loaded_data["product_instructions"]["product_palette"]
-        self.product_instructions_tab.product_palette = ProductPalette(product_palette_data)
-
-        # Track node_uid to make sure that any new nodes will get a unique UID
-        max_node_uid = -1
-
-        # For each product, convert the saved connection data (tuples of dicts)
-        # into a list of tuples of OperationNode widgets.
-
-        added_uids = []  # list of node uids to avoid duplicate nodes
-
-        def find_node_by_uid_in_con_list(uid, con_list):
-            for con in con_list:
-                if con[0].node_uid == uid:
-                    return con[0]
-                if con[1].node_uid == uid:
-                    return con[1]
-            return None
-
-        for prod_id, connections in product_palette_data.items():
+        # Transform data from use case file into a production system object (without any Qt objects)
+        # and populate widgets with it
+        production_system = ProductionSystem.load_from_json(path)
+        self.production_resources_tab.production_system = production_system
+
+        # Populate Production Resources tab
+        self.production_resources_tab.populate_widgets_with_loaded_data()
+
+        # Load product instructions: the GUI works with OperationNode widgets instead of the loaded OperationNodeClean objects,
+        # each node_uid gets exactly one widget that is referenced by all connections containing it
+        graph_panel = self.product_instructions_tab.graph_panel
+        node_widgets = {}  # node_uid: OperationNode
+        widget_palette = {}
+        for prod_id, connections in production_system.product_instructions.product_palette.items():
             widget_connections = []
-            # Loop over each saved connection for the product.
             for connection in connections:
-                # Check if the connection entry is non-empty and has at least two elements.
-                if not connection or len(connection) < 2:
-                    continue  # Skip this connection if it's empty or incomplete
-
-                # Each valid connection is assumed to be a tuple (or list) of two dictionaries.
-                start_data = connection[0]
-                end_data = connection[1]
-
-                # Convert saved display_pos (a list) into a QPoint.
-                start_pos = QtCore.QPoint(*start_data.get("display_pos", [0, 0]))
-                end_pos = QtCore.QPoint(*end_data.get("display_pos", [0, 0]))
-
-                # Create the start OperationNode widget using saved data.
-                display_text = start_data["operation_name"] if start_data.get("operation_name") else start_data["node_type"]
-                start_node = OperationNode(
-                    text=display_text,
-                    node_type=start_data.get("node_type", ""),
-                    operation_name=start_data.get("operation_name", ""),
-                    display_pos=start_pos,
-                    node_uid=start_data.get("node_uid", None),
-                    components=start_data.get("components", {}),
-                    capabilities=start_data.get("capabilities", []),
-                    tools=start_data.get("tools", {}),
-                    processing_time_value=start_data.get("processing_time_value", 0.0),
-                    processing_time_unit=start_data.get("processing_time_unit", ""),
-                    output_name=start_data.get("output_name", "")
-                )
-                if start_node.node_uid > max_node_uid:
-                    max_node_uid = start_node.node_uid
-
-                # If a node has already been dropped and added to the workspace, no need to add it again, just need to reference it.
-                # Check whether a node with the same UID is already in the connection tuples in the widget_connections
-                if start_node.node_uid not in added_uids:
-                    added_uids.append(start_node.node_uid)
-                    self.product_instructions_tab.graph_panel.add_node(start_node)
-                else:
-                    # This node UID has already been added to the graph panel
-                    start_node = find_node_by_uid_in_con_list(start_node.node_uid, widget_connections)
-
-                # Create the end OperationNode widget using saved data.
-                display_text = end_data["operation_name"] if end_data.get("operation_name") else end_data["node_type"]
-                end_node = OperationNode(
-                    text=display_text,
-                    node_type=end_data.get("node_type", ""),
-                    operation_name=end_data.get("operation_name", ""),
-                    display_pos=end_pos,
-                    node_uid=end_data.get("node_uid", None),
-                    components=end_data.get("components", {}),
-                    capabilities=end_data.get("capabilities", []),
-                    tools=end_data.get("tools", {}),
-                    processing_time_value=end_data.get("processing_time_value", 0.0),
-                    processing_time_unit=end_data.get("processing_time_unit", ""),
-                    output_name=end_data.get("output_name", "")
-                )
-                if end_node.node_uid > max_node_uid:
-                    max_node_uid = end_node.node_uid
-                
-                # If a node has already been dropped and added to the workspace, no need to add it again, just need to reference it.
-                # Check whether a node with the same UID is already in the connection tuples in the widget_connections
-                if end_node.node_uid not in added_uids:
-                    added_uids.append(end_node.node_uid)
-                    self.product_instructions_tab.graph_panel.add_node(end_node)
-                else:
-                    # This node UID has already been added to the graph panel
-                    end_node = find_node_by_uid_in_con_list(end_node.node_uid, widget_connections)
+                widget_connection = []
+                for node in connection:
+                    if node.node_uid not in node_widgets:
+                        node_pos = QtCore.QPoint(*node.display_pos)
+                        node_widget = OperationNode(
+                            text=node.operation_name if node.operation_name else node.node_type,
+                            node_type=node.node_type,
+                            operation_name=node.operation_name,
+                            display_pos=node_pos,
+                            node_uid=node.node_uid,
+                            components=node.components,
+                            capabilities=node.capabilities,
+                            tools=node.tools,
+                            processing_time_value=node.processing_time_value,
+                            processing_time_unit=node.processing_time_unit,
+                            output_name=node.output_name
+                        )
+                        graph_panel.add_node(node_widget)
+
+                        # Mark the node as already dropped so its drag behavior is updated,
+                        # place it at its saved position in the GraphPanel's workspace and make it visible
+                        node_widget.dropped = True
+                        node_widget.move(node_pos)
+                        node_widget.setParent(graph_panel.workspace)
+                        node_widget.show()
+                        node_widgets[node.node_uid] = node_widget
+                    widget_connection.append(node_widgets[node.node_uid])
+                widget_connections.append(tuple(widget_connection))
+            widget_palette[prod_id] = widget_connections
+        self.product_instructions_tab.product_palette = ProductPalette(product_palette=widget_palette)
 
-                self.product_instructions_tab.graph_panel.node_uid = max_node_uid + 1
-
-                # Mark the nodes as already dropped so their drag behavior is updated.
-                start_node.dropped = True
-                end_node.dropped = True
-
-                # Place the nodes at their saved positions.
-                start_node.move(start_pos)
-                end_node.move(end_pos)
-
-                # Set the parent of the nodes to the GraphPanel's workspace.
-                start_node.setParent(self.product_instructions_tab.graph_panel.workspace)
-                end_node.setParent(self.product_instructions_tab.graph_panel.workspace)
-
-                # Make sure the nodes are visible.
-                start_node.show()
-                end_node.show()
-
-                # Append the tuple of widget objects to our list.
-                widget_connections.append((start_node, end_node))
-            
-            # Replace the saved (dictionary-based) connections with the widget connections.
-            self.product_instructions_tab.product_palette.product_palette[prod_id] = widget_connections
+        # Track node_uid to make sure that any new nodes will get a unique UID
+        if node_widgets:
+            graph_panel.node_uid = max(node_widgets.keys()) + 1
 
         # Update the product list widget in the left panel.
         self.product_instructions_tab.product_list_widget.clear()
-        for prod_id in product_palette_data.keys():
+        for prod_id in widget_palette.keys():
             self.product_instructions_tab.product_list_widget.addItem(prod_id)
 
         # Optionally, automatically select the first product to trigger update_product_graph_display.
         if self.product_instructions_tab.product_list_widget.count() > 0:
             self.product_instructions_tab.product_list_widget.setCurrentRow(0)
-        # self.product_instructions_tab.graph_panel.just_dropped_node = None
 
         # Finally, update the GraphPanel so that your QPainter-based paintEvent will redraw the arrows,
         # now that the widget connections have been properly created.
-        self.product_instructions_tab.graph_panel.update()
+        graph_panel.update()
 
         # Also make a reference to product palette for the production system object
-        self.production_resources_tab.production_system.product_instructions = self.product_instructions_tab.product_palette
+        production_system.product_instructions = self.product_instructions_tab.product_palette
 
         # Load order data
-        order_data = loaded_data['order_list']['order_list']
-        order_list = dict()
-        for order_id, order_dict in order_data.items():
-            order = Order(order_id=order_dict['order_id'],
-                          products=order_dict['products'],
-                          release_time=order_dict['release_time'],
-                          deadline=order_dict['deadline'])
-            order_list[order_id] = order
+        for order in production_system.order_list.order_list.values():
             self.order_data_tab.add_new_order(provided_order=order)
 
-        # Provide loaded order list to the production system object
-        self.production_resources_tab.production_system.order_list = OrderList(order_list=order_list)
-
         # Load simulation parameters (for the SimulationTab)
-        self.simulation_tab.start_time_input.setDateTime(QtCore.QDateTime.fromSecsSinceEpoch(loaded_data['start_timestamp']))
-        self.simulation_tab.end_time_input.setDateTime(QtCore.QDateTime.fromSecsSinceEpoch(loaded_data['end_timestamp']))
-
-        # Load supply behaviours (a bit complicated...)
-        sb_write_dict = {}
-        for comp_name, supply_beh in loaded_data['supply_behaviours'].items():
-            sb = SupplyBehaviour(component_id=comp_name,
-                                 allocation_type=SupplyAllocationType(supply_beh['allocation_type']),
-                                 time_unit=supply_beh['time_unit'],
-                                 immediate_probability=supply_beh['immediate_probability'],
-                                 min=supply_beh['min'],
-                                 alpha=supply_beh['alpha'],
-                                 beta=supply_beh['beta'])
-            sb_write_dict.update({comp_name: sb})
-        self.production_resources_tab.production_system.supply_behaviours = sb_write_dict
-
-        # Load inventories
-        inv_write_dict = {}
-        for inv_id, inv_specs in loaded_data['inventories'].items():
-            inv = Inventory(inventory_id=inv_id,
-                            diff_comp_comb=inv_specs['diff_comp_comb'],
-                            generation_type=InventoryGenerationType(inv_specs['generation_type']),
-                            sequence_type=BufferSequenceType(inv_specs['sequence_type'] if inv_specs['sequence_type'] is not None else 3),  # FREE as default if unspecified
-                            comp_specific_sizes=inv_specs['comp_specific_sizes'],
-                            identical_buffer=inv_specs['identical_buffer'])
-            inv_write_dict.update({inv_id: inv})
-        self.production_resources_tab.production_system.inventories = inv_write_dict
-
-        # Load distance matrix
-        self.production_resources_tab.production_system.distance_matrix = loaded_data['distance_matrix']
-
-        # Set simulation parameters
-        self.production_resources_tab.production_system.start_timestamp = loaded_data['start_timestamp']
-        self.production_resources_tab.production_system.end_timestamp = loaded_data['end_timestamp']
-
-        # Load system-wide parameters
-        self.production_resources_tab.production_system.walking_speed = loaded_data['walking_speed']
-        self.production_resources_tab.production_system.energy_costs = loaded_data['energy_costs']
+        self.simulation_tab.start_time_input.setDateTime(QtCore.QDateTime.fromSecsSinceEpoch(production_system.start_timestamp))
+        self.simulation_tab.end_time_input.setDateTime(QtCore.QDateTime.fromSecsSinceEpoch(production_system.end_timestamp))
 
         # Set system-wide parameters in GUI
-        self.simulation_tab.walking_speed_input.setText(str(self.production_resources_tab.production_system.walking_speed))
-        self.simulation_tab.energy_costs_input.setText(str(self.production_resources_tab.production_system.energy_costs))
+        self.simulation_tab.walking_speed_input.setText(str(production_system.walking_speed))
+        self.simulation_tab.energy_costs_input.setText(str(production_system.energy_costs))
 
     def onLoadUseCaseButtonClick(self):
         print("Load use case")